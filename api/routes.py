@@ -1,17 +1,21 @@
 """API routes for the derivatives trading dashboard."""
 
-from fastapi import APIRouter, WebSocket, Request
-from typing import List
-import json
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Request, Response
+from typing import Callable, Dict, List, Set, Tuple
 import asyncio
 import logging
-from datetime import datetime, timedelta
-
-from models import PortfolioItem, Alert, DMADataPoint, IVDataPoint, OptionType, Priority
+from contextlib import contextmanager
+from datetime import date, timedelta
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
+import orjson
+
+from models import PortfolioItem, Alert, DMADataPoint, IVDataPoint, DashboardData, OptionType, Priority
 from services.data_generator import (
     generate_mock_positions, generate_mock_alerts, generate_dma_curve, generate_iv_curve
 )
-from services.database import get_db
+from services.database import get_db, query, iter_query, run_in_db_thread, TursoClient
 from services.market_data import get_stock_price
 from services.cache import cache
 
@@ -23,160 +27,214 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 # In-memory storage for websocket connections
-active_connections: List[WebSocket] = []
+active_connections: Set[WebSocket] = set()
+
+# Immutable view of active_connections, rebuilt only on connect/disconnect
+# so broadcasts can iterate it without copying the set each time
+_connection_snapshot: Tuple[WebSocket, ...] = ()
+
+# A client that can't take a broadcast within this many seconds (full socket
+# buffer, stalled network) is dropped instead of holding up every broadcast
+BROADCAST_SEND_TIMEOUT = 5.0
+
+# How long dashboard responses stay cached (inputs change at most daily)
+CACHE_TTL_SECONDS = 300
+
+# How long browsers may reuse a response before asking again; kept short so
+# polling dashboards still pick up a rebuilt server-side entry quickly
+BROWSER_CACHE_SECONDS = 30
+
+# Rows for the latest date with IV data (any data, not requiring 3+ tickers),
+# resolved by a subquery so it's a single round-trip
+LATEST_IV_SQL = """
+    SELECT date, atm_iv
+    FROM iv_history
+    WHERE date = (
+        SELECT MAX(date) FROM iv_history WHERE atm_iv IS NOT NULL
+    ) AND atm_iv IS NOT NULL
+    ORDER BY ticker
+    LIMIT 20
+"""
+
+# One lock per cache key so concurrent misses rebuild an entry only once
+_cache_locks: Dict[str, asyncio.Lock] = {}
+
+
+def allow_browser_caching(request: Request, response: Response):
+    """Let the browser reuse a response briefly unless ``nocache=1`` was passed."""
+    if request.query_params.get("nocache") != "1":
+        response.headers["Cache-Control"] = f"max-age={BROWSER_CACHE_SECONDS}"
+
+
+async def get_cached_or_fetch(request: Request, cache_key: str, fetch: Callable[[], list],
+                              fallback: Callable[[], list], label: str) -> list:
+    """
+    Serve a dashboard payload from the TTL cache, rebuilding it on a miss.
+    
+    Passing ``nocache=1`` bypasses the cached value. Empty results or errors
+    from ``fetch`` fall back to mock data, which is cached the same way.
+    """
+    nocache = request.query_params.get("nocache") == "1"
+    
+    # Try to get from cache first
+    if not nocache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Returning {label} from cache")
+            return cached
+    
+    lock = _cache_locks.setdefault(cache_key, asyncio.Lock())
+    async with lock:
+        # Another request may have filled the entry while we waited
+        if not nocache:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        # Database drivers (and the market-data lookups behind the mock
+        # fallbacks) are blocking, so keep them off the event loop
+        try:
+            data = await run_in_db_thread(fetch)
+            if data:
+                logger.info(f"Returning {len(data)} real {label} records from database")
+            else:
+                logger.info(f"No real {label} found, falling back to mock data")
+                data = await asyncio.to_thread(fallback)
+        except Exception as e:
+            logger.error(f"Error fetching {label}: {e}")
+            data = await asyncio.to_thread(fallback)
+        
+        cache.set(cache_key, data, ttl_seconds=CACHE_TTL_SECONDS)
+        return data
+
+
+async def get_cached_by_ticker(request: Request, cache_key: str,
+                               fetch: Callable[[], dict], label: str) -> dict:
+    """
+    Serve a by-ticker payload from the TTL cache, rebuilding it on a miss.
+    
+    There is no mock fallback here: an empty result (no data, or a failed
+    query) is returned uncached so the next request tries the database again.
+    """
+    nocache = request.query_params.get("nocache") == "1"
+    
+    if not nocache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Returning {label} from cache")
+            return cached
+    
+    lock = _cache_locks.setdefault(cache_key, asyncio.Lock())
+    async with lock:
+        if not nocache:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        data = await run_in_db_thread(fetch)
+        if data:
+            cache.set(cache_key, data, ttl_seconds=CACHE_TTL_SECONDS)
+        return data
 
 
 @router.get("/debug/tickers")
 async def get_debug_tickers():
     """Debug endpoint to check what tickers are in the database."""
     try:
-        with get_db() as db:
-            is_turso = hasattr(db, 'execute')
-            
-            if is_turso:
-                result = db.execute("SELECT DISTINCT ticker FROM daily_prices ORDER BY ticker")
-                tickers = [row['ticker'] for row in result]
-                count_result = db.execute("SELECT COUNT(*) as count FROM daily_prices")
-                count = count_result[0]['count'] if count_result else 0
-            else:
-                cursor = db.cursor()
-                cursor.execute("SELECT DISTINCT ticker FROM daily_prices ORDER BY ticker")
-                tickers = [row[0] for row in cursor.fetchall()]
-                cursor.execute("SELECT COUNT(*) FROM daily_prices")
-                count = cursor.fetchone()[0]
-            
-            return {
-                "tickers": tickers,
-                "total_rows": count,
-                "source": "turso" if is_turso else "sqlite"
-            }
+        return await run_in_db_thread(fetch_debug_tickers)
     except Exception as e:
         return {"error": str(e)}
 
 
+def fetch_debug_tickers() -> dict:
+    """Summarize the tickers and row count in daily_prices."""
+    with get_db() as db:
+        # Per-ticker counts give both the ticker list and the total in one scan
+        rows = query(db, "SELECT ticker, COUNT(*) AS n FROM daily_prices GROUP BY ticker ORDER BY ticker")
+        tickers = [row['ticker'] for row in rows]
+        count = sum(int(row['n']) for row in rows)
+        
+        return {
+            "tickers": tickers,
+            "total_rows": count,
+            "source": "turso" if isinstance(db, TursoClient) else "sqlite"
+        }
+
+
 @router.get("/positions", response_model=List[PortfolioItem])
-async def get_positions(request: Request):
+async def get_positions(request: Request, response: Response):
     """Get portfolio positions from database with fallback to mock data."""
-    # Check if nocache parameter is present
-    nocache = request.query_params.get("nocache") == "1"
-    
-    # Try to get from cache first
-    if not nocache:
-        cached_positions = cache.get("positions")
-        if cached_positions is not None:
-            logger.info("Returning positions from cache")
-            return cached_positions
-    
-    try:
-        positions = fetch_positions_from_db()
-        if positions:
-            logger.info(f"Returning {len(positions)} real positions from database")
-            # Cache the result for 5 minutes
-            cache.set("positions", positions, ttl_seconds=300)
-            return positions
-        else:
-            logger.warning("No real positions found in database, falling back to mock data")
-            mock_positions = generate_mock_positions()
-            cache.set("positions", mock_positions, ttl_seconds=300)
-            return mock_positions
-    except Exception as e:
-        logger.error(f"Error fetching positions: {e}")
-        mock_positions = generate_mock_positions()
-        cache.set("positions", mock_positions, ttl_seconds=300)
-        return mock_positions
+    allow_browser_caching(request, response)
+    return await get_cached_or_fetch(
+        request, "positions", fetch_positions_from_db, generate_mock_positions, "positions"
+    )
+
+
+@lru_cache(maxsize=1)
+def position_expiration(today: date) -> str:
+    """Expiration date (30 days out) shown on positions; changes once a day."""
+    return (today + timedelta(days=30)).isoformat()
 
 
 def fetch_positions_from_db() -> List[PortfolioItem]:
-    """Fetch positions from database with proper error handling."""
+    """
+    Fetch positions from database with proper error handling.
+    
+    Models are built with model_construct: the values come from our own
+    database and FastAPI validates them against response_model anyway.
+    """
     try:
         with get_db() as db:
-            # Check if we're using Turso or SQLite
-            is_turso = hasattr(db, 'execute')
+            # Latest price and IV row per ticker joined in a single query
+            # (limit to 10 positions)
+            rows = query(db, """
+                WITH p AS (
+                    SELECT ticker, open, close,
+                           ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY date DESC) AS rn
+                    FROM daily_prices
+                ),
+                i AS (
+                    SELECT ticker, atm_iv,
+                           ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY date DESC) AS rn
+                    FROM iv_history
+                )
+                SELECT p.ticker, p.open, p.close, i.atm_iv
+                FROM p
+                LEFT JOIN i ON i.ticker = p.ticker AND i.rn = 1
+                WHERE p.rn = 1
+                ORDER BY p.ticker
+                LIMIT 10
+            """)
             
-            if is_turso:
-                # For Turso, we need to get distinct tickers first
-                ticker_result = db.execute("SELECT DISTINCT ticker FROM daily_prices ORDER BY ticker")
-                tickers = [row['ticker'] for row in ticker_result]
-            else:
-                # For SQLite
-                cursor = db.cursor()
-                cursor.execute("SELECT DISTINCT ticker FROM daily_prices ORDER BY ticker")
-                tickers = [row[0] for row in cursor.fetchall()]
+            # Values shared by every position in this request
+            expiration = position_expiration(date.today())
+            quantity = 10
+            call, put = OptionType.CALL, OptionType.PUT
+            
+            # Simplified greeks
+            gamma = 0.01
+            theta = -0.05
+            vega = 0.1
             
             positions = []
-            for i, ticker in enumerate(tickers[:10]):  # Limit to 10 positions
-                if is_turso:
-                    # Get recent data for this ticker (last record)
-                    price_data = db.execute("""
-                        SELECT * FROM daily_prices 
-                        WHERE ticker = ? 
-                        ORDER BY date DESC 
-                        LIMIT 1
-                    """, [ticker])
-                    
-                    iv_data = db.execute("""
-                        SELECT * FROM iv_history 
-                        WHERE ticker = ? 
-                        ORDER BY date DESC 
-                        LIMIT 1
-                    """, [ticker])
-                    
-                    if not price_data:
-                        continue
-                        
-                    latest_price = price_data[0]
-                    latest_iv = iv_data[0] if iv_data else None
-                else:
-                    # For SQLite
-                    cursor = db.cursor()
-                    cursor.execute("""
-                        SELECT * FROM daily_prices 
-                        WHERE ticker = ? 
-                        ORDER BY date DESC 
-                        LIMIT 1
-                    """, (ticker,))
-                    price_row = cursor.fetchone()
-                    
-                    if not price_row:
-                        continue
-                    
-                    latest_price = dict(price_row)  # Convert Row to dict
-                    
-                    cursor.execute("""
-                        SELECT * FROM iv_history 
-                        WHERE ticker = ? 
-                        ORDER BY date DESC 
-                        LIMIT 1
-                    """, (ticker,))
-                    iv_row = cursor.fetchone()
-                    latest_iv = dict(iv_row) if iv_row else None
-                
+            for i, row in enumerate(rows, start=1):
                 # Create portfolio item based on real data
-                close_price = latest_price['close']
-                open_price = latest_price['open']
+                close_price = row['close']
                 
                 # Determine option type based on price movement
-                option_type = OptionType.CALL if close_price > open_price else OptionType.PUT
+                is_call = close_price > row['open']
                 strike = round(close_price, 2)
-                expiration = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
-                quantity = 10
                 avg_price = round(strike * 0.95, 2)  # Slightly OTM assumption
-                market_price = round(strike, 2)
+                market_price = strike
                 pnl = round((market_price - avg_price) * quantity, 2)
                 
                 # Use real IV if available, otherwise generate mock
-                iv = latest_iv['iv_30day'] if latest_iv and latest_iv.get('iv_30day') else 0.3
+                iv = row['atm_iv'] or 0.3
                 
-                # Simplified greeks
-                delta = 0.5 if option_type == OptionType.CALL else -0.5
-                gamma = 0.01
-                theta = -0.05
-                vega = 0.1
-
-                position = PortfolioItem(
-                    id=f"pos_{i+1}",
-                    symbol=ticker,
-                    type=option_type,
+                positions.append(PortfolioItem.model_construct(
+                    id=f"pos_{i}",
+                    symbol=row['ticker'],
+                    type=call if is_call else put,
                     strike=strike,
                     expiration=expiration,
                     quantity=quantity,
@@ -184,12 +242,11 @@ def fetch_positions_from_db() -> List[PortfolioItem]:
                     marketPrice=market_price,
                     pnl=pnl,
                     iv=iv,
-                    delta=delta,
+                    delta=0.5 if is_call else -0.5,
                     gamma=gamma,
                     theta=theta,
                     vega=vega
-                )
-                positions.append(position)
+                ))
             
             return positions
     
@@ -199,152 +256,80 @@ def fetch_positions_from_db() -> List[PortfolioItem]:
 
 
 @router.get("/alerts", response_model=List[Alert])
-async def get_alerts(request: Request):
+async def get_alerts(request: Request, response: Response):
     """Generate alerts based on actual data from database with fallback to mock."""
-    # Check if nocache parameter is present
-    nocache = request.query_params.get("nocache") == "1"
-    
-    # Try to get from cache first
-    if not nocache:
-        cached_alerts = cache.get("alerts")
-        if cached_alerts is not None:
-            logger.info("Returning alerts from cache")
-            return cached_alerts
-    
-    try:
-        alerts = fetch_alerts_from_db()
-        if alerts:
-            # Cache the result for 5 minutes
-            cache.set("alerts", alerts, ttl_seconds=300)
-            return alerts
-        else:
-            logger.info("No real alerts generated, falling back to mock data")
-            mock_alerts = generate_mock_alerts()
-            cache.set("alerts", mock_alerts, ttl_seconds=300)
-            return mock_alerts
-    except Exception as e:
-        logger.error(f"Error generating alerts: {e}")
-        mock_alerts = generate_mock_alerts()
-        cache.set("alerts", mock_alerts, ttl_seconds=300)
-        return mock_alerts
+    allow_browser_caching(request, response)
+    return await get_cached_or_fetch(
+        request, "alerts", fetch_alerts_from_db, generate_mock_alerts, "alerts"
+    )
 
 
 def fetch_alerts_from_db() -> List[Alert]:
     """Generate alerts based on database analysis."""
     try:
         with get_db() as db:
-            # Check if we're using Turso or SQLite
-            is_turso = hasattr(db, 'execute')
-            
-            alerts = []
-            
-            # Check for IV spikes - join iv_history with iv_52wk_ranges
-            if is_turso:
-                iv_rows = db.execute("""
-                    SELECT h.ticker, h.date, h.atm_iv, r.low_52wk
-                    FROM iv_history h
+            # Both alert families are filtered in SQL and arrive in one round-trip:
+            # - IV spikes: latest IV per ticker above 1.8x its 52-week low (max 3)
+            # - Large price movements: latest bar per ticker moving more than 5%
+            rows = query(db, """
+                SELECT * FROM (
+                    SELECT 'iv' AS kind, h.ticker, h.date, h.atm_iv AS value, r.low_52wk AS reference
+                    FROM (
+                        SELECT ticker, date, atm_iv,
+                               ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY date DESC) AS rn
+                        FROM iv_history
+                        WHERE atm_iv IS NOT NULL
+                    ) h
                     JOIN iv_52wk_ranges r ON h.ticker = r.ticker
-                    WHERE h.atm_iv IS NOT NULL AND r.low_52wk IS NOT NULL AND r.low_52wk > 0
-                    ORDER BY h.date DESC 
-                    LIMIT 20
-                """)
-            else:
-                cursor = db.cursor()
-                cursor.execute("""
-                    SELECT h.ticker, h.date, h.atm_iv, r.low_52wk
-                    FROM iv_history h
-                    JOIN iv_52wk_ranges r ON h.ticker = r.ticker
-                    WHERE h.atm_iv IS NOT NULL AND r.low_52wk IS NOT NULL AND r.low_52wk > 0
-                    ORDER BY h.date DESC 
-                    LIMIT 20
-                """)
-                iv_rows = [dict(row) for row in cursor.fetchall()]
+                    WHERE h.rn = 1 AND r.low_52wk > 0 AND h.atm_iv > r.low_52wk * 1.8
+                    ORDER BY h.date DESC, h.ticker
+                    LIMIT 3
+                )
+                UNION ALL
+                SELECT * FROM (
+                    SELECT 'price' AS kind, ticker, date,
+                           (close - open) / open * 100 AS value, NULL AS reference
+                    FROM (
+                        SELECT ticker, date, open, close,
+                               ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY date DESC) AS rn
+                        FROM daily_prices
+                        WHERE open > 0 AND close > 0
+                    )
+                    WHERE rn = 1 AND ABS(close - open) > open * 0.05
+                    ORDER BY date DESC, ticker
+                    LIMIT 5
+                )
+                ORDER BY kind, date DESC, ticker
+            """)
             
-            alert_id = 1
-            seen_tickers = set()
-            for row in iv_rows:
+            alerts = []
+            for alert_id, row in enumerate(rows[:5], start=1):  # Return maximum of 5 alerts
                 ticker = row['ticker']
-                if ticker in seen_tickers:
-                    continue
-                seen_tickers.add(ticker)
                 
-                atm_iv = row['atm_iv']
-                low_52wk = row['low_52wk']
-                
-                # Check for IV spike (>80% of 52-week range from low)
-                if atm_iv > low_52wk * 1.8:
-                    alert = Alert(
+                if row['kind'] == 'iv':
+                    atm_iv = row['value']
+                    alert = Alert.model_construct(
                         id=f"alert_iv_{alert_id}",
                         title=f"IV Elevated: {ticker}",
                         description=f"{ticker} IV at {(atm_iv*100):.1f}%, near 52-week high",
                         timestamp=row['date'],
-                        priority=Priority.HIGH if atm_iv > low_52wk * 2 else Priority.MEDIUM,
+                        priority=Priority.HIGH if atm_iv > row['reference'] * 2 else Priority.MEDIUM,
                         read=False
                     )
-                    alerts.append(alert)
-                    alert_id += 1
-                    if alert_id > 3:  # Limit to 3 IV alerts
-                        break
-            
-            # Check for large price movements (>5% in a day)
-            if is_turso:
-                price_rows = db.execute("""
-                    SELECT ticker, date, open, close
-                    FROM daily_prices 
-                    WHERE open > 0 AND close > 0
-                    ORDER BY date DESC 
-                    LIMIT 50
-                """)
-            else:
-                cursor = db.cursor()
-                cursor.execute("""
-                    SELECT ticker, date, open, close
-                    FROM daily_prices 
-                    WHERE open > 0 AND close > 0
-                    ORDER BY date DESC 
-                    LIMIT 50
-                """)
-                price_rows = [dict(row) for row in cursor.fetchall()]
-            
-            # Group by ticker
-            ticker_prices = {}
-            for row in price_rows:
-                ticker = row['ticker']
-                if ticker not in ticker_prices:
-                    ticker_prices[ticker] = []
-                ticker_prices[ticker].append(row)
-            
-            # Check for large movements
-            for ticker, prices in ticker_prices.items():
-                if len(prices) < 2:
-                    continue
-                
-                # Check most recent day
-                latest = prices[0]
-                open_price = latest['open']
-                close_price = latest['close']
-                
-                if open_price > 0:
-                    pct_change = ((close_price - open_price) / open_price) * 100
-                    
-                    if abs(pct_change) > 5:  # 5% threshold
-                        priority = Priority.HIGH if abs(pct_change) > 10 else Priority.MEDIUM
-                        direction = "gained" if pct_change > 0 else "dropped"
-                        
-                        alert = Alert(
-                            id=f"alert_price_{alert_id}",
-                            title=f"Large Price Movement: {ticker}",
-                            description=f"{ticker} {direction} {abs(pct_change):.1f}% today",
-                            timestamp=latest['date'],
-                            priority=priority,
-                            read=False
-                        )
-                        alerts.append(alert)
-                        alert_id += 1
-                        if alert_id > 6:  # Limit total alerts
-                            break
+                else:
+                    pct_change = row['value']
+                    direction = "gained" if pct_change > 0 else "dropped"
+                    alert = Alert.model_construct(
+                        id=f"alert_price_{alert_id}",
+                        title=f"Large Price Movement: {ticker}",
+                        description=f"{ticker} {direction} {abs(pct_change):.1f}% today",
+                        timestamp=row['date'],
+                        priority=Priority.HIGH if abs(pct_change) > 10 else Priority.MEDIUM,
+                        read=False
+                    )
+                alerts.append(alert)
             
-            return alerts[:5]  # Return maximum of 5 alerts
+            return alerts
     
     except Exception as e:
         logger.error(f"Error fetching alerts from database: {e}")
@@ -352,93 +337,50 @@ def fetch_alerts_from_db() -> List[Alert]:
 
 
 @router.get("/dma-data", response_model=List[DMADataPoint])
-async def get_dma_data(request: Request):
+async def get_dma_data(request: Request, response: Response):
     """Fetch daily_prices from database, calculate DMA (20-day simple moving average)."""
-    # Check if nocache parameter is present
-    nocache = request.query_params.get("nocache") == "1"
-    
-    # Try to get from cache first
-    if not nocache:
-        cached_dma = cache.get("dma_data")
-        if cached_dma is not None:
-            logger.info("Returning DMA data from cache")
-            return cached_dma
-    
-    try:
-        dma_data = fetch_dma_from_db()
-        if dma_data:
-            logger.info(f"Returning {len(dma_data)} real DMA data points from database")
-            # Cache the result for 5 minutes
-            cache.set("dma_data", dma_data, ttl_seconds=300)
-            return dma_data
-        else:
-            logger.info("No real DMA data found, falling back to mock data")
-            mock_dma = generate_dma_curve()
-            cache.set("dma_data", mock_dma, ttl_seconds=300)
-            return mock_dma
-    except Exception as e:
-        logger.error(f"Error calculating DMA: {e}")
-        mock_dma = generate_dma_curve()
-        cache.set("dma_data", mock_dma, ttl_seconds=300)
-        return mock_dma
+    allow_browser_caching(request, response)
+    return await get_cached_or_fetch(
+        request, "dma_data", fetch_dma_from_db, generate_dma_curve, "DMA data"
+    )
 
 
 def fetch_dma_from_db() -> List[DMADataPoint]:
     """Fetch DMA (20-day moving average) from daily_prices."""
     try:
         with get_db() as db:
-            is_turso = hasattr(db, 'execute')
-            prices = []
-            
             # Get first available ticker from database (not hardcoded SPY)
-            if is_turso:
-                ticker_rows = db.execute("SELECT DISTINCT ticker FROM daily_prices LIMIT 1")
-                if ticker_rows:
-                    ticker = ticker_rows[0]['ticker']
-                    logger.info(f"Using ticker '{ticker}' for DMA calculation")
-                    prices = db.execute("""
-                        SELECT date, close 
-                        FROM daily_prices 
-                        WHERE ticker = ?
-                        ORDER BY date DESC 
-                        LIMIT 50
-                    """, [ticker])
-                    prices = list(reversed(prices))
-            else:
-                # For SQLite
-                cursor = db.cursor()
-                cursor.execute("SELECT DISTINCT ticker FROM daily_prices LIMIT 1")
-                ticker_row = cursor.fetchone()
-                if ticker_row:
-                    ticker = ticker_row[0]
-                    logger.info(f"Using ticker '{ticker}' for DMA calculation")
-                    cursor.execute("""
-                        SELECT date, close 
-                        FROM daily_prices 
-                        WHERE ticker = ?
-                        ORDER BY date DESC 
-                        LIMIT 50
-                    """, (ticker,))
-                    prices = [dict(row) for row in reversed(cursor.fetchall())]
-            
-            if not prices:
+            ticker_rows = query(db, "SELECT DISTINCT ticker FROM daily_prices LIMIT 1")
+            if not ticker_rows:
                 return []
             
-            # Calculate 20-day SMA
-            dma_data = []
-            window_size = 20
+            ticker = ticker_rows[0]['ticker']
+            logger.info(f"Using ticker '{ticker}' for DMA calculation")
             
-            for i in range(window_size - 1, len(prices)):
-                # Calculate SMA for the window ending at index i
-                window = prices[i - window_size + 1:i + 1]
-                sma = sum(p['close'] for p in window) / window_size
-                
-                dma_data.append(DMADataPoint(
-                    time=prices[i]['date'],
-                    value=round(sma, 2)
-                ))
+            # 20-day SMA over the last 50 bars, computed by a window function;
+            # only rows with a full window are returned
+            rows = query(db, """
+                SELECT date, sma FROM (
+                    SELECT date,
+                           AVG(close) OVER w AS sma,
+                           COUNT(*) OVER w AS n
+                    FROM (
+                        SELECT date, close
+                        FROM daily_prices
+                        WHERE ticker = ?
+                        ORDER BY date DESC
+                        LIMIT 50
+                    )
+                    WINDOW w AS (ORDER BY date ROWS BETWEEN 19 PRECEDING AND CURRENT ROW)
+                )
+                WHERE n = 20
+                ORDER BY date
+            """, [ticker])
             
-            return dma_data
+            return [
+                DMADataPoint.model_construct(time=row['date'], value=round(row['sma'], 2))
+                for row in rows
+            ]
     
     except Exception as e:
         logger.error(f"Error calculating DMA from database: {e}")
@@ -446,114 +388,33 @@ def fetch_dma_from_db() -> List[DMADataPoint]:
 
 
 @router.get("/iv-data", response_model=List[IVDataPoint])
-async def get_iv_data(request: Request):
+async def get_iv_data(request: Request, response: Response):
     """Fetch iv_history from database."""
-    # Check if nocache parameter is present
-    nocache = request.query_params.get("nocache") == "1"
-    
-    # Try to get from cache first
-    if not nocache:
-        cached_iv = cache.get("iv_data")
-        if cached_iv is not None:
-            logger.info("Returning IV data from cache")
-            return cached_iv
-    
-    try:
-        iv_data = fetch_iv_from_db()
-        if iv_data:
-            # Cache the result for 5 minutes
-            cache.set("iv_data", iv_data, ttl_seconds=300)
-            return iv_data
-        else:
-            logger.info("No real IV data found, falling back to mock data")
-            mock_iv = generate_iv_curve()
-            cache.set("iv_data", mock_iv, ttl_seconds=300)
-            return mock_iv
-    except Exception as e:
-        logger.error(f"Error fetching IV data: {e}")
-        mock_iv = generate_iv_curve()
-        cache.set("iv_data", mock_iv, ttl_seconds=300)
-        return mock_iv
+    allow_browser_caching(request, response)
+    return await get_cached_or_fetch(
+        request, "iv_data", fetch_iv_from_db, generate_iv_curve, "IV data"
+    )
 
 
 def fetch_iv_from_db() -> List[IVDataPoint]:
     """Fetch IV data from iv_history table using atm_iv column."""
     try:
         with get_db() as db:
-            is_turso = hasattr(db, 'execute')
-            rows = []
-            
-            if is_turso:
-                # Find the latest date with IV data (any data, not requiring 3+ tickers)
-                date_check = db.execute("""
-                    SELECT date 
-                    FROM iv_history 
-                    WHERE atm_iv IS NOT NULL 
-                    GROUP BY date 
-                    ORDER BY date DESC 
-                    LIMIT 1
-                """)
-                
-                if not date_check:
-                    logger.warning("No IV data found in database")
-                    return []
-                
-                latest_date = date_check[0]['date']
-                logger.info(f"Using IV data from date: {latest_date}")
-                
-                rows = db.execute("""
-                    SELECT h.ticker, h.atm_iv, r.high_52wk, r.low_52wk
-                    FROM iv_history h
-                    LEFT JOIN iv_52wk_ranges r ON h.ticker = r.ticker
-                    WHERE h.date = ? AND h.atm_iv IS NOT NULL
-                    ORDER BY h.ticker
-                """, [latest_date])
-            else:
-                cursor = db.cursor()
-                cursor.execute("""
-                    SELECT date 
-                    FROM iv_history 
-                    WHERE atm_iv IS NOT NULL 
-                    GROUP BY date 
-                    ORDER BY date DESC 
-                    LIMIT 1
-                """)
-                date_row = cursor.fetchone()
-                
-                if not date_row:
-                    return []
-                
-                latest_date = date_row[0]
-                
-                cursor.execute("""
-                    SELECT h.ticker, h.atm_iv, r.high_52wk, r.low_52wk
-                    FROM iv_history h
-                    LEFT JOIN iv_52wk_ranges r ON h.ticker = r.ticker
-                    WHERE h.date = ? AND h.atm_iv IS NOT NULL
-                    ORDER BY h.ticker
-                """, (latest_date,))
-                rows = [dict(row) for row in cursor.fetchall()]
+            rows = query(db, LATEST_IV_SQL)
             
             if not rows:
-                logger.warning("No IV rows found for the latest date")
+                logger.warning("No IV data found in database")
                 return []
             
+            logger.info(f"Using IV data from date: {rows[0]['date']}")
             logger.info(f"Found {len(rows)} IV records from database")
             
-            # Transform to IVDataPoint objects
-            iv_points = []
-            for i, row in enumerate(rows[:20]):
-                ticker = row['ticker']
-                atm_iv = row['atm_iv']
-                
-                if atm_iv is not None:
-                    # Use ticker position for distinct strike values
-                    strike = float(100 + i * 10)
-                    
-                    iv_points.append(IVDataPoint(
-                        strike=round(strike, 0),
-                        iv=round(atm_iv, 3)
-                    ))
+            # Transform to IVDataPoint objects in one pass (the query already
+            # drops NULL IVs); ticker position gives distinct strike values
+            iv_points = [
+                IVDataPoint.model_construct(strike=float(100 + i * 10), iv=round(row['atm_iv'], 3))
+                for i, row in enumerate(rows)
+            ]
             
             logger.info(f"Returning {len(iv_points)} real IV data points")
             return iv_points
@@ -563,12 +424,28 @@ def fetch_iv_from_db() -> List[IVDataPoint]:
         return []
 
 
+@router.get("/dashboard", response_model=DashboardData)
+async def get_dashboard(request: Request, response: Response):
+    """Fetch positions, alerts, DMA and IV data concurrently in one response."""
+    allow_browser_caching(request, response)
+    positions, alerts, dma, iv = await asyncio.gather(
+        get_cached_or_fetch(request, "positions", fetch_positions_from_db, generate_mock_positions, "positions"),
+        get_cached_or_fetch(request, "alerts", fetch_alerts_from_db, generate_mock_alerts, "alerts"),
+        get_cached_or_fetch(request, "dma_data", fetch_dma_from_db, generate_dma_curve, "DMA data"),
+        get_cached_or_fetch(request, "iv_data", fetch_iv_from_db, generate_iv_curve, "IV data"),
+    )
+    return {"positions": positions, "alerts": alerts, "dma": dma, "iv": iv}
+
+
 @router.get("/dma-data-by-ticker")
-async def get_dma_data_by_ticker():
+async def get_dma_data_by_ticker(request: Request, response: Response):
     """Fetch DMA data for all tickers, grouped by ticker."""
     try:
-        dma_by_ticker = fetch_dma_by_ticker()
+        dma_by_ticker = await get_cached_by_ticker(
+            request, "dma_by_ticker", fetch_dma_by_ticker, "DMA by ticker"
+        )
         if dma_by_ticker:
+            allow_browser_caching(request, response)
             return {"tickers": dma_by_ticker}
         return {"tickers": {}, "error": "No DMA data found"}
     except Exception as e:
@@ -580,70 +457,34 @@ def fetch_dma_by_ticker() -> dict:
     """Fetch 50-day and 200-day DMA for each ticker in the database."""
     try:
         with get_db() as db:
-            is_turso = hasattr(db, 'execute')
-            
-            # Get all tickers
-            if is_turso:
-                ticker_rows = db.execute("SELECT DISTINCT ticker FROM daily_prices ORDER BY ticker")
-                tickers = [row['ticker'] for row in ticker_rows]
-            else:
-                cursor = db.cursor()
-                cursor.execute("SELECT DISTINCT ticker FROM daily_prices ORDER BY ticker")
-                tickers = [row[0] for row in cursor.fetchall()]
+            # Both moving averages for every ticker in one query. Each ticker
+            # is limited to its first 250 bars and to points that have at least
+            # the 50-day DMA; the 200-day DMA is only set once 200 bars exist.
+            rows = iter_query(db, """
+                SELECT ticker, date, close, dma_50,
+                       CASE WHEN rn >= 200 THEN dma_200 END AS dma_200
+                FROM (
+                    SELECT ticker, date, close,
+                           ROW_NUMBER() OVER w AS rn,
+                           AVG(close) OVER (w ROWS 49 PRECEDING) AS dma_50,
+                           AVG(close) OVER (w ROWS 199 PRECEDING) AS dma_200
+                    FROM daily_prices
+                    WINDOW w AS (PARTITION BY ticker ORDER BY date)
+                )
+                WHERE rn BETWEEN 50 AND 250
+                ORDER BY ticker, date
+            """)
             
             result = {}
-            dma_50_window = 50
-            dma_200_window = 200
-            
-            for ticker in tickers:
-                if is_turso:
-                    prices = db.execute("""
-                        SELECT date, close 
-                        FROM daily_prices 
-                        WHERE ticker = ?
-                        ORDER BY date ASC 
-                        LIMIT 250
-                    """, [ticker])
-                else:
-                    cursor.execute("""
-                        SELECT date, close 
-                        FROM daily_prices 
-                        WHERE ticker = ?
-                        ORDER BY date ASC 
-                        LIMIT 250
-                    """, (ticker,))
-                    prices = [dict(row) for row in cursor.fetchall()]
-                
-                # Need at least 200 days for full 200-day DMA
-                if len(prices) < dma_50_window:
-                    continue
-                
-                # Calculate 50-day and 200-day DMA
-                dma_data = []
-                for i in range(len(prices)):
-                    point = {
-                        "time": prices[i]['date'],
-                        "close": round(prices[i]['close'], 2)
-                    }
-                    
-                    # 50-day DMA (if we have enough data)
-                    if i >= dma_50_window - 1:
-                        window_50 = prices[i - dma_50_window + 1:i + 1]
-                        dma_50 = sum(p['close'] for p in window_50) / dma_50_window
-                        point["dma_50"] = round(dma_50, 2)
-                    
-                    # 200-day DMA (if we have enough data)
-                    if i >= dma_200_window - 1:
-                        window_200 = prices[i - dma_200_window + 1:i + 1]
-                        dma_200 = sum(p['close'] for p in window_200) / dma_200_window
-                        point["dma_200"] = round(dma_200, 2)
-                    
-                    # Only include points that have at least the 50-day DMA
-                    if "dma_50" in point:
-                        dma_data.append(point)
-                
-                if dma_data:
-                    result[ticker] = dma_data
+            for row in rows:
+                point = {
+                    "time": row['date'],
+                    "close": round(row['close'], 2),
+                    "dma_50": round(row['dma_50'], 2)
+                }
+                if row['dma_200'] is not None:
+                    point["dma_200"] = round(row['dma_200'], 2)
+                result.setdefault(row['ticker'], []).append(point)
             
             logger.info(f"Returning 50/200-day DMA data for {len(result)} tickers")
             return result
@@ -654,11 +495,14 @@ def fetch_dma_by_ticker() -> dict:
 
 
 @router.get("/iv-data-by-ticker")
-async def get_iv_data_by_ticker():
+async def get_iv_data_by_ticker(request: Request, response: Response):
     """Fetch IV history for all tickers, grouped by ticker."""
     try:
-        iv_by_ticker = fetch_iv_by_ticker()
+        iv_by_ticker = await get_cached_by_ticker(
+            request, "iv_by_ticker", fetch_iv_by_ticker, "IV by ticker"
+        )
         if iv_by_ticker:
+            allow_browser_caching(request, response)
             return {"tickers": iv_by_ticker}
         return {"tickers": {}, "error": "No IV data found"}
     except Exception as e:
@@ -670,58 +514,28 @@ def fetch_iv_by_ticker() -> dict:
     """Fetch IV history for each ticker in the database."""
     try:
         with get_db() as db:
-            is_turso = hasattr(db, 'execute')
+            # One scan over all tickers' history, grouped in Python as rows
+            # are read from the cursor
+            rows = iter_query(db, """
+                SELECT h.ticker, h.date, h.atm_iv, r.high_52wk, r.low_52wk
+                FROM iv_history h
+                LEFT JOIN iv_52wk_ranges r ON h.ticker = r.ticker
+                WHERE h.atm_iv IS NOT NULL
+                ORDER BY h.ticker, h.date ASC
+            """)
             
-            # Get all tickers with IV data
-            if is_turso:
-                ticker_rows = db.execute("""
-                    SELECT DISTINCT ticker 
-                    FROM iv_history 
-                    WHERE atm_iv IS NOT NULL 
-                    ORDER BY ticker
-                """)
-                tickers = [row['ticker'] for row in ticker_rows]
-            else:
-                cursor = db.cursor()
-                cursor.execute("""
-                    SELECT DISTINCT ticker 
-                    FROM iv_history 
-                    WHERE atm_iv IS NOT NULL 
-                    ORDER BY ticker
-                """)
-                tickers = [row[0] for row in cursor.fetchall()]
-            
-            result = {}
-            
-            for ticker in tickers:
-                if is_turso:
-                    rows = db.execute("""
-                        SELECT h.date, h.atm_iv, r.high_52wk, r.low_52wk
-                        FROM iv_history h
-                        LEFT JOIN iv_52wk_ranges r ON h.ticker = r.ticker
-                        WHERE h.ticker = ? AND h.atm_iv IS NOT NULL
-                        ORDER BY h.date ASC
-                    """, [ticker])
-                else:
-                    cursor.execute("""
-                        SELECT h.date, h.atm_iv, r.high_52wk, r.low_52wk
-                        FROM iv_history h
-                        LEFT JOIN iv_52wk_ranges r ON h.ticker = r.ticker
-                        WHERE h.ticker = ? AND h.atm_iv IS NOT NULL
-                        ORDER BY h.date ASC
-                    """, (ticker,))
-                    rows = [dict(row) for row in cursor.fetchall()]
-                
-                if rows:
-                    result[ticker] = [
-                        {
-                            "date": row['date'],
-                            "iv": round(row['atm_iv'], 3),
-                            "iv_52wk_high": row.get('high_52wk'),
-                            "iv_52wk_low": row.get('low_52wk')
-                        }
-                        for row in rows
-                    ]
+            result = {
+                ticker: [
+                    {
+                        "date": row['date'],
+                        "iv": round(row['atm_iv'], 3),
+                        "iv_52wk_high": row.get('high_52wk'),
+                        "iv_52wk_low": row.get('low_52wk')
+                    }
+                    for row in group
+                ]
+                for ticker, group in groupby(rows, key=itemgetter('ticker'))
+            }
             
             logger.info(f"Returning IV data for {len(result)} tickers")
             return result
@@ -731,27 +545,81 @@ def fetch_iv_by_ticker() -> dict:
         return {}
 
 
+def add_connection(websocket: WebSocket):
+    """Register a websocket for broadcasts."""
+    global _connection_snapshot
+    active_connections.add(websocket)
+    _connection_snapshot = tuple(active_connections)
+
+
+def remove_connection(websocket: WebSocket):
+    """Unregister a websocket; safe to call more than once."""
+    global _connection_snapshot
+    if websocket in active_connections:
+        active_connections.discard(websocket)
+        _connection_snapshot = tuple(active_connections)
+
+
+@contextmanager
+def track_connection(websocket: WebSocket):
+    """Register a websocket for broadcasts, removing it however the handler exits."""
+    add_connection(websocket)
+    try:
+        yield
+    finally:
+        remove_connection(websocket)
+
+
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time updates."""
     await websocket.accept()
-    active_connections.append(websocket)
     
-    try:
-        while True:
-            # Keep the connection alive
-            await asyncio.sleep(30)
-    except Exception as e:
-        logger.error(f"WebSocket error: {e}")
-    finally:
-        active_connections.remove(websocket)
+    with track_connection(websocket):
+        try:
+            # Wait on inbound frames rather than sleeping; the server's ping/pong
+            # keepalive closes dead peers, which surfaces here as a disconnect
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            logger.error(f"WebSocket error: {e}")
 
 
 async def broadcast_update(update_data: dict):
     """Broadcast update to all active WebSocket connections."""
-    for connection in active_connections.copy():
-        try:
-            await connection.send_text(json.dumps(update_data))
-        except Exception as e:
-            logger.error(f"Error sending WebSocket message: {e}")
-            active_connections.remove(connection)
\ No newline at end of file
+    connections = _connection_snapshot
+    if not connections:
+        return
+    
+    # Serialize once (orjson is several times faster than json) and send to
+    # every client concurrently so one slow peer doesn't hold up the rest.
+    # Text frames are kept because browser clients JSON.parse the message data.
+    message = orjson.dumps(update_data).decode()
+    results = await asyncio.gather(
+        *(asyncio.wait_for(connection.send_text(message), BROADCAST_SEND_TIMEOUT)
+          for connection in connections),
+        return_exceptions=True
+    )
+    
+    dropped = []
+    for connection, result in zip(connections, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error sending WebSocket message: {result}")
+            remove_connection(connection)
+            dropped.append(connection)
+    
+    # A timed-out send may have left a partial frame on the wire, so dropped
+    # clients are closed rather than just forgotten; that ends their handler
+    # and tells the browser to reconnect
+    if dropped:
+        await asyncio.gather(*(_close_dropped_connection(connection) for connection in dropped))
+
+
+async def _close_dropped_connection(connection: WebSocket):
+    """Close a websocket that failed a broadcast, ignoring errors from a dead peer."""
+    try:
+        await asyncio.wait_for(connection.close(code=1011), BROADCAST_SEND_TIMEOUT)
+    except Exception as e:
+        logger.debug(f"Error closing dropped WebSocket: {e}")
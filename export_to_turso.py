@@ -56,18 +56,20 @@ def export_table(conn, table_name, output_file):
     # Get column names
     col_names = [desc[0] for desc in cursor.description]
     
-    # Export as INSERT statements (batch for efficiency)
+    # Export as multi-row INSERT statements, one per batch, so the importer
+    # sends (and Turso parses) one statement per 100 rows instead of per row
     batch_size = 100
     total = 0
+    insert_prefix = f"INSERT INTO {table_name} ({', '.join(col_names)}) VALUES"
     
     for i in range(0, len(rows), batch_size):
         batch = rows[i:i+batch_size]
         
-        for row in batch:
-            values = [escape_sql(val) for val in row]
-            insert = f"INSERT INTO {table_name} ({', '.join(col_names)}) VALUES ({', '.join(values)});"
-            print(insert, file=output_file)
-            total += 1
+        values = ",\n".join(
+            f"({', '.join(escape_sql(val) for val in row)})" for row in batch
+        )
+        print(f"{insert_prefix}\n{values};", file=output_file)
+        total += len(batch)
         
         print(f"-- Progress: {min(i+batch_size, len(rows))}/{len(rows)} rows", file=output_file)
     
@@ -12,8 +12,7 @@ Usage:
 import os
 import sys
 import requests
-import re
-import time
+from concurrent.futures import ThreadPoolExecutor
 
 TURSO_URL = os.getenv('TURSO_DATABASE_URL', '').replace('libsql://', 'https://').rstrip('/')
 TURSO_TOKEN = os.getenv('TURSO_AUTH_TOKEN')
@@ -22,11 +21,20 @@ if not TURSO_URL or not TURSO_TOKEN:
     print("Error: Set TURSO_DATABASE_URL and TURSO_AUTH_TOKEN")
     sys.exit(1)
 
+# Concurrent batch uploads; each request mostly waits on the network
+IMPORT_WORKERS = int(os.getenv('IMPORT_WORKERS', '8'))
+
 HEADERS = {
     'Authorization': f'Bearer {TURSO_TOKEN}',
     'Content-Type': 'application/json'
 }
 
+# One keep-alive session for every batch, with a connection per worker, so
+# batches reuse TLS connections instead of handshaking per request
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=IMPORT_WORKERS))
+
 def execute_statements(statements):
     """Execute a batch of SQL statements via Turso HTTP API."""
     payload = {
@@ -37,9 +45,8 @@ def execute_statements(statements):
     }
     
     # Use the correct v2 endpoint format
-    response = requests.post(
+    response = SESSION.post(
         f'{TURSO_URL}/v2/pipeline',
-        headers=HEADERS,
         json=payload,
         timeout=60
     )
@@ -49,6 +56,26 @@ def execute_statements(statements):
         return False
     return True
 
+def iter_statements(path):
+    """
+    Yield the SQL statements in a dump file one at a time.
+    
+    Lines are read as a stream and joined until one ends with ';'. Comment
+    lines are skipped, so a statement that follows a comment is kept.
+    """
+    lines = []
+    with open(path, 'r') as f:
+        for line in f:
+            stripped = line.strip()
+            if not stripped or stripped.startswith('--'):
+                continue
+            lines.append(line)
+            if stripped.endswith(';'):
+                yield ''.join(lines).strip()[:-1]
+                lines = []
+    if lines:
+        yield ''.join(lines).strip()
+
 def main():
     sql_file = sys.argv[1] if len(sys.argv) > 1 else 'turso_export.sql'
     
@@ -59,18 +86,18 @@ def main():
     print(f"Importing {sql_file} to Turso...")
     print(f"Target: {TURSO_URL}")
     
-    # Read and parse SQL file
-    with open(sql_file, 'r') as f:
-        content = f.read()
-    
-    # Split into individual statements
-    statements = [s.strip() for s in re.split(r';\n', content) if s.strip() and not s.strip().startswith('--')]
+    # Parse the file in one streaming pass, routing each statement by its
+    # leading keyword (only the first few characters are uppercased)
+    setup_statements = []
+    data_statements = []
+    for stmt in iter_statements(sql_file):
+        keyword = stmt[:6].upper()
+        if keyword == 'INSERT':
+            data_statements.append(stmt)
+        elif keyword.startswith(('CREATE', 'DROP', 'PRAGMA')):
+            setup_statements.append(stmt)
     
-    print(f"Total statements: {len(statements)}")
-    
-    # First, run CREATE TABLE and PRAGMA statements
-    setup_statements = [s for s in statements if s.upper().startswith(('CREATE', 'DROP', 'PRAGMA'))]
-    data_statements = [s for s in statements if s.upper().startswith('INSERT')]
+    print(f"Total statements: {len(setup_statements) + len(data_statements)}")
     
     print(f"Setup statements: {len(setup_statements)}")
     print(f"Data statements: {len(data_statements)}")
@@ -86,22 +113,28 @@ def main():
     # Execute INSERTs in batches
     print("\nInserting data...")
     batch_size = 25
-    total_batches = (len(data_statements) + batch_size - 1) // batch_size
+    batches = [data_statements[i:i+batch_size] for i in range(0, len(data_statements), batch_size)]
+    total_batches = len(batches)
+    failed_batches = []
     
-    for i in range(0, len(data_statements), batch_size):
-        batch = data_statements[i:i+batch_size]
-        batch_num = i // batch_size + 1
-        
-        if execute_statements(batch):
-            print(f"  Batch {batch_num}/{total_batches}: {len(batch)} rows ✓")
-        else:
-            print(f"  Batch {batch_num}/{total_batches}: FAILED")
-            # Try one by one
-            for stmt in batch:
-                if not execute_statements([stmt]):
-                    print(f"    Skipped: {stmt[:60]}...")
-        
-        time.sleep(0.1)  # Brief pause between batches
+    # Upload several batches at once; results come back in batch order
+    with ThreadPoolExecutor(max_workers=IMPORT_WORKERS) as executor:
+        for batch_num, (batch, ok) in enumerate(zip(batches, executor.map(execute_statements, batches)), start=1):
+            if ok:
+                print(f"  Batch {batch_num}/{total_batches}: {len(batch)} statements ✓")
+            else:
+                print(f"  Batch {batch_num}/{total_batches}: FAILED")
+                failed_batches.append(batch)
+    
+    # Retry failed batches one by one
+    for batch in failed_batches:
+        for stmt in batch:
+            if not execute_statements([stmt]):
+                print(f"    Skipped: {stmt[:60]}...")
+    
+    # Refresh planner statistics for the freshly loaded tables
+    if execute_statements(["ANALYZE"]):
+        print("\n✓ Updated query planner statistics")
     
     print("\n✓ Import complete!")
     print(f"Check your data at: https://turso.tech/app")
@@ -1,21 +1,56 @@
 """Main FastAPI application for the derivatives trading dashboard."""
 
 import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 import uvicorn
 
 from api.routes import router
+from services.database import ensure_indexes, close_pool
+from services.timing import request_timings, timed
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+class TimedORJSONResponse(ORJSONResponse):
+    """ORJSONResponse that records body rendering time under 'serialize'."""
+    
+    def render(self, content) -> bytes:
+        with timed("serialize"):
+            return super().render(content)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Make sure the query indexes exist on startup (the API still serves,
+    more slowly, without them) and close pooled connections on shutdown.
+    """
+    try:
+        await asyncio.to_thread(ensure_indexes)
+    except Exception as e:
+        logger.warning(f"Could not create database indexes: {e}")
+    yield
+    close_pool()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Derivatives Trading Dashboard API",
     description="Backend API for the derivatives trading dashboard",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # orjson renders response bodies several times faster than stdlib json
+    default_response_class=TimedORJSONResponse
 )
 
 # Add CORS middleware - allow localhost dev servers and configured origins
@@ -31,6 +66,28 @@ app.add_middleware(
 # Include API routes
 app.include_router(router)
 
+
+@app.middleware("http")
+async def add_timing_headers(request: Request, call_next):
+    """
+    Report total, database and JSON rendering time per request to help find
+    hot spots. Rendering covers only the orjson encoding of the response body;
+    response_model validation and handler time are part of the total alone.
+    """
+    start = time.perf_counter_ns()
+    with request_timings() as timings:
+        response = await call_next(request)
+    total_ns = time.perf_counter_ns() - start
+    db_ns = timings.get("db", 0)
+    serialize_ns = timings.get("serialize", 0)
+    
+    response.headers["X-Route-Total-ns"] = str(total_ns)
+    response.headers["X-Route-DB-ns"] = str(db_ns)
+    response.headers["X-Route-Serialize-ns"] = str(serialize_ns)
+    logger.debug(f"{request.method} {request.url.path}: total={total_ns}ns db={db_ns}ns serialize={serialize_ns}ns")
+    return response
+
+
 @app.get("/")
 async def root():
     """Health check endpoint."""
@@ -38,4 +95,19 @@ async def root():
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run("main:app", host="0.0.0.0", port=port, reload=True)
\ No newline at end of file
+    # Auto-reload is for development only (ENV=dev); otherwise run one worker
+    # per core (override with WEB_CONCURRENCY). Caches and the connection pool
+    # are per process.
+    dev = os.getenv("ENV") == "dev"
+    workers = 1 if dev else int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+    # uvicorn's default loop="auto" uses uvloop/httptools when installed.
+    # Protocol-level ping/pong lets the server drop dead websocket peers
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        reload=dev,
+        workers=workers,
+        ws_ping_interval=20,
+        ws_ping_timeout=20
+    )
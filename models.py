@@ -1,6 +1,6 @@
 """Data models for the derivatives trading dashboard."""
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import List, Optional
 from enum import Enum
 
@@ -16,7 +16,15 @@ class Priority(str, Enum):
     LOW = "low"
 
 
+# Response models are cached and shared between requests, so they are
+# immutable (which also makes them hashable); unknown fields are rejected
+# rather than silently dropped.
+MODEL_CONFIG = ConfigDict(frozen=True, extra='forbid')
+
+
 class PortfolioItem(BaseModel):
+    model_config = MODEL_CONFIG
+    
     id: str
     symbol: str
     type: OptionType
@@ -34,6 +42,8 @@ class PortfolioItem(BaseModel):
 
 
 class Alert(BaseModel):
+    model_config = MODEL_CONFIG
+    
     id: str
     title: str
     description: str
@@ -43,10 +53,23 @@ class Alert(BaseModel):
 
 
 class DMADataPoint(BaseModel):
+    model_config = MODEL_CONFIG
+    
     time: str
     value: float
 
 
 class IVDataPoint(BaseModel):
+    model_config = MODEL_CONFIG
+    
     strike: float
-    iv: float
\ No newline at end of file
+    iv: float
+
+
+class DashboardData(BaseModel):
+    model_config = MODEL_CONFIG
+    
+    positions: List[PortfolioItem]
+    alerts: List[Alert]
+    dma: List[DMADataPoint]
+    iv: List[IVDataPoint]
@@ -1,40 +1,70 @@
 """Simple TTL-based in-memory cache implementation."""
 
 import time
-from typing import Any, Dict, Optional
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Optional
+
+# Number of least recently used entries checked for expiry on each set()
+CLEANUP_SAMPLE_SIZE = 4
 
 
 class TTLCache:
-    """A simple dictionary-based TTL cache."""
-    
-    def __init__(self):
-        self._cache: Dict[str, tuple[Any, float]] = {}
-    
+    """
+    A dictionary-based TTL cache with an LRU size bound.
+
+    Expiry uses the monotonic clock, so wall-clock adjustments can't make
+    entries live too long or expire early. Once ``max_size`` entries are
+    stored, the least recently used one is evicted. Each set() also drops
+    expired entries from the least recently used end, so keys that are
+    written but never read again don't linger until eviction and calling
+    cleanup_expired() is optional.
+    """
+
+    def __init__(self, max_size: int = 10_000):
+        self.max_size = max_size
+        self._cache: "OrderedDict[str, tuple[Any, float]]" = OrderedDict()
+
     def get(self, key: str) -> Optional[Any]:
         """Retrieve a value from the cache if it exists and hasn't expired."""
-        if key in self._cache:
-            value, expiry = self._cache[key]
-            if time.time() < expiry:
-                return value
-            else:
-                # Remove expired entry
-                del self._cache[key]
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+
+        value, expiry = entry
+        if time.monotonic() < expiry:
+            self._cache.move_to_end(key)
+            return value
+
+        # Remove expired entry
+        del self._cache[key]
         return None
-    
+
     def set(self, key: str, value: Any, ttl_seconds: int = 300):
         """Store a value in the cache with a TTL (time-to-live) in seconds."""
-        expiry = time.time() + ttl_seconds
-        self._cache[key] = (value, expiry)
-    
+        now = time.monotonic()
+        self._cache[key] = (value, now + ttl_seconds)
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+        
+        # Amortized cleanup: the oldest entries are the likeliest to be stale
+        expired_keys = [
+            old_key for old_key, (_, expiry) in islice(self._cache.items(), CLEANUP_SAMPLE_SIZE)
+            if now >= expiry
+        ]
+        for old_key in expired_keys:
+            del self._cache[old_key]
+
     def clear(self):
         """Clear all entries from the cache."""
         self._cache.clear()
-        
+
     def cleanup_expired(self):
         """Remove expired entries from the cache."""
-        now = time.time()
+        now = time.monotonic()
         expired_keys = [
-            key for key, (_, expiry) in self._cache.items() 
+            key for key, (_, expiry) in self._cache.items()
             if now >= expiry
         ]
         for key in expired_keys:
@@ -42,4 +72,4 @@ class TTLCache:
 
 
 # Global cache instance
-cache = TTLCache()
\ No newline at end of file
+cache = TTLCache()
@@ -1,10 +1,19 @@
 """Financial calculations for the derivatives backend."""
 
 import math
-from typing import Dict
+from functools import lru_cache
+from typing import Dict, NamedTuple
 from data.mock_data import BASE_PRICES
 
 
+class Greeks(NamedTuple):
+    """Option greeks; immutable so results can be memoized and shared."""
+    delta: float
+    gamma: float
+    theta: float
+    vega: float
+
+
 def calculate_greeks(symbol: str, strike: float, option_type: str) -> Dict[str, float]:
     """
     Calculate option greeks using simplified approximations.
@@ -17,6 +26,17 @@ def calculate_greeks(symbol: str, strike: float, option_type: str) -> Dict[str,
     Returns:
         Dictionary containing delta, gamma, theta, vega
     """
+    # A fresh dict per call, so callers can't modify the shared cached result
+    return _calculate_greeks(symbol, strike, option_type)._asdict()
+
+
+# Both calculations are pure functions of their hashable arguments and the
+# portfolio repeats the same (symbol, strike, type) on every refresh, so
+# results are memoized. Call _calculate_greeks.cache_clear() and
+# calculate_iv.cache_clear() after BASE_PRICES changes.
+@lru_cache(maxsize=4096)
+def _calculate_greeks(symbol: str, strike: float, option_type: str) -> Greeks:
+    """Compute the greeks for calculate_greeks as an immutable, cacheable tuple."""
     # Get base price for the symbol
     base_price = BASE_PRICES.get(symbol, 100.0)
     
@@ -37,14 +57,15 @@ def calculate_greeks(symbol: str, strike: float, option_type: str) -> Dict[str,
     # Vega approximation
     vega = 0.1 * gamma * base_price * 0.2
     
-    return {
-        "delta": round(delta, 3),
-        "gamma": round(gamma, 5),
-        "theta": round(theta, 4),
-        "vega": round(vega, 3)
-    }
+    return Greeks(
+        delta=round(delta, 3),
+        gamma=round(gamma, 5),
+        theta=round(theta, 4),
+        vega=round(vega, 3)
+    )
 
 
+@lru_cache(maxsize=4096)
 def calculate_iv(symbol: str, strike: float, option_type: str) -> float:
     """
     Calculate implied volatility using a simplified model.
@@ -67,9 +88,10 @@ def calculate_iv(symbol: str, strike: float, option_type: str) -> float:
     adjustment = 0.1 * math.exp(-distance * 5)  # Higher IV closer to money
     
     # Additional adjustment based on option type and moneyness
-    if option_type.lower() == "call" and strike < base_price:
+    option_type = option_type.lower()
+    if option_type == "call" and strike < base_price:
         adjustment += 0.05  # ITM calls have higher IV
-    elif option_type.lower() == "put" and strike > base_price:
+    elif option_type == "put" and strike > base_price:
         adjustment += 0.05  # ITM puts have higher IV
         
     return round(base_iv + adjustment, 3)
\ No newline at end of file
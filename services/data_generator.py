@@ -14,7 +14,7 @@ except ImportError:
     np = None
 
 from models import PortfolioItem, Alert, DMADataPoint, IVDataPoint, OptionType, Priority
-from services.market_data import get_stock_price
+from services.market_data import get_stock_prices
 
 def generate_mock_positions(count: int = 10) -> List[PortfolioItem]:
     """Generate mock portfolio positions, using real stock prices when available."""
@@ -24,16 +24,19 @@ def generate_mock_positions(count: int = 10) -> List[PortfolioItem]:
         return real_positions
     
     # Fallback to original mock generation if real data fails
-    positions = []
-    
     symbols = ["AAPL", "GOOGL", "MSFT", "AMZN", "TSLA", "NVDA", "META", "NFLX", "AMD", "INTC"]
     option_types = [OptionType.CALL, OptionType.PUT]
+    now = datetime.now()
+    
+    if NUMPY_AVAILABLE:
+        return _generate_mock_positions_vectorized(count, symbols, option_types, now)
     
+    positions = []
     for i in range(count):
         symbol = random.choice(symbols)
         option_type = random.choice(option_types)
         strike = round(random.uniform(100, 500), 2)
-        expiration = (datetime.now() + timedelta(days=random.randint(1, 365))).strftime("%Y-%m-%d")
+        expiration = (now + timedelta(days=random.randint(1, 365))).strftime("%Y-%m-%d")
         quantity = random.randint(1, 100)
         avg_price = round(random.uniform(5, 50), 2)
         
@@ -48,7 +51,8 @@ def generate_mock_positions(count: int = 10) -> List[PortfolioItem]:
         theta = round(random.uniform(-0.5, 0), 4)
         vega = round(random.uniform(0, 0.5), 4)
         
-        position = PortfolioItem(
+        # Mock values are generated with the right types, so validation is skipped
+        position = PortfolioItem.model_construct(
             id=f"pos_{i+1}",
             symbol=symbol,
             type=option_type,
@@ -69,6 +73,63 @@ def generate_mock_positions(count: int = 10) -> List[PortfolioItem]:
     return positions
 
 
+def _generate_mock_positions_vectorized(count, symbols, option_types, now) -> List[PortfolioItem]:
+    """Draw every mock position field as one NumPy array instead of per-row RNG calls."""
+    rng = np.random.default_rng()
+    
+    position_symbols = _batch_choice(rng, symbols, count)
+    position_types = _batch_choice(rng, option_types, count)
+    strikes = rng.uniform(100, 500, count).round(2)
+    expiration_days = rng.integers(1, 366, count)
+    quantities = rng.integers(1, 101, count)
+    avg_prices = rng.uniform(5, 50, count).round(2)
+    
+    # Generate realistic market data
+    market_prices = (avg_prices * rng.uniform(0.8, 1.2, count)).round(2)
+    pnls = ((market_prices - avg_prices) * quantities).round(2)
+    ivs = rng.uniform(0.1, 0.8, count).round(2)
+    
+    # Greeks calculated realistically
+    deltas = rng.uniform(-1, 1, count).round(2)
+    gammas = rng.uniform(0, 0.1, count).round(4)
+    thetas = rng.uniform(-0.5, 0, count).round(4)
+    vegas = rng.uniform(0, 0.5, count).round(4)
+    
+    # At most 365 distinct expirations, so each date is formatted once
+    expirations = {
+        days: (now + timedelta(days=days)).strftime("%Y-%m-%d")
+        for days in set(expiration_days.tolist())
+    }
+    
+    # tolist() converts back to plain Python numbers so the models serialize
+    # exactly like validated ones
+    columns = zip(
+        position_symbols, position_types, strikes.tolist(), expiration_days.tolist(),
+        quantities.tolist(), avg_prices.tolist(), market_prices.tolist(), pnls.tolist(),
+        ivs.tolist(), deltas.tolist(), gammas.tolist(), thetas.tolist(), vegas.tolist()
+    )
+    return [
+        PortfolioItem.model_construct(
+            id=f"pos_{i+1}",
+            symbol=symbol,
+            type=option_type,
+            strike=strike,
+            expiration=expirations[days],
+            quantity=quantity,
+            avgPrice=avg_price,
+            marketPrice=market_price,
+            pnl=pnl,
+            iv=iv,
+            delta=delta,
+            gamma=gamma,
+            theta=theta,
+            vega=vega
+        )
+        for i, (symbol, option_type, strike, days, quantity, avg_price, market_price, pnl, iv, delta, gamma, theta, vega)
+        in enumerate(columns)
+    ]
+
+
 def generate_real_positions() -> List[PortfolioItem]:
     """Generate realistic positions using real stock prices from yfinance."""
     try:
@@ -77,21 +138,20 @@ def generate_real_positions() -> List[PortfolioItem]:
         option_types = [OptionType.CALL, OptionType.PUT]
         positions = []
         
-        # Get real stock prices
-        real_prices = {}
-        for symbol in symbols:
-            price = get_stock_price(symbol)
-            if price is not None:
-                real_prices[symbol] = price
+        # Get real stock prices (one batched download for all symbols)
+        real_prices = get_stock_prices(symbols)
         
         # If we can't get any real prices, return empty list to fallback to mock
         if not real_prices:
             return []
         
-        # Generate positions based on real prices
+        # Generate positions based on real prices; option types for every
+        # position are drawn in one call
+        now = datetime.now()
+        drawn_types = iter(random.choices(option_types, k=2 * len(real_prices)))
         for i, (symbol, current_price) in enumerate(real_prices.items()):
             for j in range(2):  # Generate 2 positions per stock
-                option_type = random.choice(option_types)
+                option_type = next(drawn_types)
                 
                 # Set strike price near current stock price
                 strike_offset = random.uniform(-0.1, 0.1) * current_price
@@ -99,12 +159,12 @@ def generate_real_positions() -> List[PortfolioItem]:
                 
                 # Expiration in 1-6 months
                 expiration_days = random.randint(30, 180)
-                expiration = (datetime.now() + timedelta(days=expiration_days)).strftime("%Y-%m-%d")
+                expiration = (now + timedelta(days=expiration_days)).strftime("%Y-%m-%d")
                 
                 quantity = random.randint(1, 100)
                 
                 # Calculate realistic average price based on strike and current price
-                intrinsic_value = max(0, current_price - strike) if option_type == OptionType.CALL else max(0, strike - current_price)
+                intrinsic_value = max(0.0, current_price - strike) if option_type == OptionType.CALL else max(0.0, strike - current_price)
                 time_value = random.uniform(0.5, 3.0) * (expiration_days / 30)  # More time = more value
                 avg_price = round(intrinsic_value + time_value, 2)
                 
@@ -118,13 +178,13 @@ def generate_real_positions() -> List[PortfolioItem]:
                 # Simplified greeks calculation
                 years_to_expiry = expiration_days / 365.0
                 delta = 0.5 + (0.4 * (current_price - strike) / current_price) if option_type == OptionType.CALL else 0.5 - (0.4 * (strike - current_price) / current_price)
-                delta = max(-1, min(1, delta))  # Clamp between -1 and 1
+                delta = max(-1.0, min(1.0, delta))  # Clamp between -1 and 1
                 
                 gamma = round(min(0.1, 0.01 + 0.05 / (1 + years_to_expiry)), 4)
                 theta = round(-0.05 * years_to_expiry, 4)
                 vega = round(0.1 + 0.3 * years_to_expiry, 4)
                 
-                position = PortfolioItem(
+                position = PortfolioItem.model_construct(
                     id=f"pos_{len(positions)+1}",
                     symbol=symbol,
                     type=option_type,
@@ -148,6 +208,10 @@ def generate_real_positions() -> List[PortfolioItem]:
         print(f"Error generating real positions: {e}")
         return []
 
+def _batch_choice(rng, options: list, count: int) -> list:
+    """Pick ``count`` items from ``options`` with one vectorized draw."""
+    return [options[i] for i in rng.integers(0, len(options), count).tolist()]
+
 def generate_mock_alerts(count: int = 5) -> List[Alert]:
     """Generate mock alerts."""
     alerts = []
@@ -169,15 +233,42 @@ def generate_mock_alerts(count: int = 5) -> List[Alert]:
     ]
     
     priorities = [Priority.HIGH, Priority.MEDIUM, Priority.LOW]
+    now = datetime.now()
+    
+    if NUMPY_AVAILABLE:
+        # Draw every field for all alerts at once; timestamps are formatted
+        # once per distinct minute offset (at most 120)
+        rng = np.random.default_rng()
+        titles = _batch_choice(rng, alert_titles, count)
+        descriptions = _batch_choice(rng, alert_descriptions, count)
+        alert_priorities = _batch_choice(rng, priorities, count)
+        minutes_ago = rng.integers(1, 121, count).tolist()
+        reads = (rng.random(count) < 0.5).tolist()
+        timestamps = {
+            minutes: (now - timedelta(minutes=minutes)).strftime("%Y-%m-%d %H:%M:%S")
+            for minutes in set(minutes_ago)
+        }
+        return [
+            Alert.model_construct(
+                id=f"alert_{i+1}",
+                title=title,
+                description=description,
+                timestamp=timestamps[minutes],
+                priority=priority,
+                read=read
+            )
+            for i, (title, description, priority, minutes, read)
+            in enumerate(zip(titles, descriptions, alert_priorities, minutes_ago, reads))
+        ]
     
     for i in range(count):
         title = random.choice(alert_titles)
         description = random.choice(alert_descriptions)
-        timestamp = (datetime.now() - timedelta(minutes=random.randint(1, 120))).strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = (now - timedelta(minutes=random.randint(1, 120))).strftime("%Y-%m-%d %H:%M:%S")
         priority = random.choice(priorities)
         read = random.choice([True, False])
         
-        alert = Alert(
+        alert = Alert.model_construct(
             id=f"alert_{i+1}",
             title=title,
             description=description,
@@ -191,44 +282,37 @@ def generate_mock_alerts(count: int = 5) -> List[Alert]:
 
 def generate_dma_curve(points: int = 50) -> List[DMADataPoint]:
     """Generate mock DMA curve data."""
-    dma_data = []
+    now = datetime.now()
+    times = [(now - timedelta(hours=points-i)).strftime("%Y-%m-%d %H:%M") for i in range(points)]
     
     # Generate a trend with some noise
-    base_value = random.uniform(0, 100)
-    
-    for i in range(points):
-        time = (datetime.now() - timedelta(hours=points-i)).strftime("%Y-%m-%d %H:%M")
-        # Add some trend and noise
-        trend = i * 0.2
-        noise = random.uniform(-5, 5)
-        value = round(base_value + trend + noise, 2)
-        
-        data_point = DMADataPoint(
-            time=time,
-            value=value
-        )
-        dma_data.append(data_point)
+    if NUMPY_AVAILABLE:
+        rng = np.random.default_rng()
+        base_value = rng.uniform(0, 100)
+        values = (base_value + np.arange(points) * 0.2 + rng.uniform(-5, 5, points)).round(2).tolist()
+    else:
+        base_value = random.uniform(0, 100)
+        values = [round(base_value + i * 0.2 + random.uniform(-5, 5), 2) for i in range(points)]
     
-    return dma_data
+    return [DMADataPoint.model_construct(time=time, value=value) for time, value in zip(times, values)]
 
 def generate_iv_curve(strikes: int = 20) -> List[IVDataPoint]:
     """Generate mock implied volatility curve data."""
-    iv_data = []
-    
     # Generate a volatility skew curve
     base_strike = 100
     base_iv = 0.3
+    atm_strike = base_strike + strikes * 2.5
     
-    for i in range(strikes):
-        strike = base_strike + i * 5
-        # Create a volatility smile/skew pattern
-        distance_from_atm = abs(strike - (base_strike + strikes * 2.5))
-        iv = round(base_iv + (distance_from_atm / 100), 3)
-        
-        data_point = IVDataPoint(
-            strike=strike,
-            iv=iv
-        )
-        iv_data.append(data_point)
+    # Create a volatility smile/skew pattern
+    if NUMPY_AVAILABLE:
+        strike_arr = base_strike + 5.0 * np.arange(strikes)
+        strike_values = strike_arr.tolist()
+        iv_values = np.round(base_iv + np.abs(strike_arr - atm_strike) / 100, 3).tolist()
+    else:
+        strike_values = [float(base_strike + i * 5) for i in range(strikes)]
+        iv_values = [round(base_iv + abs(strike - atm_strike) / 100, 3) for strike in strike_values]
     
-    return iv_data
\ No newline at end of file
+    return [
+        IVDataPoint.model_construct(strike=strike, iv=iv)
+        for strike, iv in zip(strike_values, iv_values)
+    ]
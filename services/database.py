@@ -4,15 +4,28 @@ Database module for Turso remote SQLite with local fallback.
 Supports:
 - Turso (HTTP API) remote database as primary
 - Local SQLite as fallback
+- Connection pooling across requests
 - Auto-initialization of tables
 """
 
 import os
+import asyncio
+import contextvars
+import functools
+import queue
 import sqlite3
 import logging
+import threading
+import time
 import requests
-from typing import Optional, List, Dict, Any
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import Counter
+from typing import Optional, List, Dict, Any, Iterator, Sequence, Tuple
 from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from services.timing import timed
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -21,6 +34,33 @@ logger = logging.getLogger(__name__)
 # Default local database path
 DEFAULT_LOCAL_DB = './market_data.db'
 
+# Connections per backend: pooled SQLite connections, database threads and
+# keep-alive HTTP connections to Turso
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '8'))
+
+# How long the pool serves local SQLite before retrying an unreachable Turso
+TURSO_RETRY_SECONDS = 30
+
+# Applied to each new local SQLite connection: a 32 MB page cache keeps the
+# price/IV tables in memory across requests, NORMAL sync avoids an fsync
+# per write transaction, and sorts for GROUP BY / window queries that can't
+# use an index stay in memory
+SQLITE_PRAGMAS = [
+    'PRAGMA cache_size = -32768',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA temp_store = MEMORY',
+]
+
+# Secondary indexes for the dashboard queries. The primary keys are
+# ascending, so "latest row per ticker" window functions ordered by
+# date DESC would otherwise sort in a temp B-tree, and the "latest IV
+# date" lookup would scan all of iv_history.
+INDEX_STATEMENTS = [
+    'CREATE INDEX IF NOT EXISTS idx_daily_prices_ticker_date ON daily_prices (ticker, date DESC)',
+    'CREATE INDEX IF NOT EXISTS idx_iv_history_ticker_date ON iv_history (ticker, date DESC)',
+    'CREATE INDEX IF NOT EXISTS idx_iv_history_date ON iv_history (date)',
+]
+
 
 class TursoClient:
     """HTTP client for Turso database."""
@@ -32,6 +72,17 @@ class TursoClient:
             'Authorization': f'Bearer {auth_token}',
             'Content-Type': 'application/json'
         }
+        # One client is shared by every database thread, so the session keeps
+        # a keep-alive connection per thread instead of a TLS handshake per
+        # request. Only connection failures are retried: urllib3 never
+        # re-sends a POST that reached the server.
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount('https://', HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=DB_POOL_SIZE,
+            max_retries=Retry(total=2, backoff_factor=0.2)
+        ))
     
     def _format_arg(self, arg) -> Dict:
         """Format argument for Turso API with proper type."""
@@ -46,27 +97,18 @@ class TursoClient:
         else:
             return {"type": "text", "value": str(arg)}
     
-    def execute(self, sql: str, args: list = None) -> List[Dict]:
-        """Execute SQL and return results via Turso HTTP API."""
-        # Format args with proper types for Turso
-        formatted_args = [self._format_arg(a) for a in (args or [])]
-        
-        payload = {
-            'requests': [
-                {
-                    'type': 'execute',
-                    'stmt': {
-                        'sql': sql,
-                        'args': formatted_args
-                    }
-                }
-            ]
-        }
-        
-        response = requests.post(
+    def _statement(self, sql: str, args: Optional[Sequence] = None,
+                   sql_id: Optional[int] = None) -> Dict:
+        """Build a pipeline execute request with typed args (by text or stored sql_id)."""
+        stmt = {'sql_id': sql_id} if sql_id is not None else {'sql': sql}
+        stmt['args'] = [self._format_arg(a) for a in (args or [])]
+        return {'type': 'execute', 'stmt': stmt}
+    
+    def _pipeline(self, pipeline_requests: List[Dict]) -> List[Dict]:
+        """POST requests to the Turso pipeline endpoint and return the raw results."""
+        response = self.session.post(
             f'{self.url}/v2/pipeline',
-            headers=self.headers,
-            json=payload,
+            json={'requests': pipeline_requests},
             timeout=30
         )
         
@@ -74,40 +116,92 @@ class TursoClient:
             logger.error(f"Turso API error: {response.status_code} - {response.text[:200]}")
             response.raise_for_status()
         
-        data = response.json()
+        return response.json().get('results', [])
+    
+    @staticmethod
+    def _parse_rows(result: Dict) -> List[Dict]:
+        """Convert one pipeline result into a list of row dicts."""
+        if 'response' not in result or 'result' not in result['response']:
+            return []
         
-        # Parse results from pipeline response
-        results = []
-        if 'results' in data:
-            for result in data['results']:
-                if 'response' in result and 'result' in result['response']:
-                    result_data = result['response']['result']
-                    rows = result_data.get('rows', [])
-                    cols = result_data.get('cols', [])
-                    
-                    for row in rows:
-                        row_dict = {}
-                        for i, col in enumerate(cols):
-                            col_name = col['name'] if isinstance(col, dict) else col
-                            cell = row[i] if i < len(row) else None
-                            # Handle Turso's value wrapper format
-                            if isinstance(cell, dict) and 'value' in cell:
-                                row_dict[col_name] = cell['value']
-                            elif isinstance(cell, dict) and 'type' in cell:
-                                row_dict[col_name] = cell.get('value')
-                            else:
-                                row_dict[col_name] = cell
-                        results.append(row_dict)
+        result_data = result['response']['result']
+        rows = result_data.get('rows', [])
+        cols = result_data.get('cols', [])
         
+        parsed = []
+        for row in rows:
+            row_dict = {}
+            for i, col in enumerate(cols):
+                col_name = col['name'] if isinstance(col, dict) else col
+                cell = row[i] if i < len(row) else None
+                # Handle Turso's value wrapper format
+                if isinstance(cell, dict) and 'value' in cell:
+                    row_dict[col_name] = cell['value']
+                elif isinstance(cell, dict) and 'type' in cell:
+                    row_dict[col_name] = cell.get('value')
+                else:
+                    row_dict[col_name] = cell
+            parsed.append(row_dict)
+        return parsed
+    
+    def execute(self, sql: str, args: list = None) -> List[Dict]:
+        """Execute SQL and return results via Turso HTTP API."""
+        results = []
+        for result in self._pipeline([self._statement(sql, args)]):
+            results.extend(self._parse_rows(result))
         return results
     
+    def execute_batch(self, statements: Sequence[Tuple[str, Sequence]]) -> List[List[Dict]]:
+        """
+        Execute several statements in one pipeline round-trip, one row list per statement.
+        
+        SQL that appears more than once is registered with ``store_sql`` and
+        executed by id, so its text is sent and parsed only once per batch.
+        """
+        sql_counts = Counter(sql for sql, _ in statements)
+        sql_ids: Dict[str, int] = {}
+        pipeline_requests = []
+        execute_positions = []
+        
+        for sql, args in statements:
+            if sql_counts[sql] > 1 and sql not in sql_ids:
+                sql_ids[sql] = len(sql_ids) + 1
+                pipeline_requests.append({'type': 'store_sql', 'sql_id': sql_ids[sql], 'sql': sql})
+            execute_positions.append(len(pipeline_requests))
+            pipeline_requests.append(self._statement(sql, args, sql_ids.get(sql)))
+        
+        results = self._pipeline(pipeline_requests)
+        return [
+            self._parse_rows(results[pos]) if pos < len(results) else []
+            for pos in execute_positions
+        ]
+    
+    def executemany(self, sql: str, args_list: Sequence[Sequence], batch_size: int = 500) -> None:
+        """
+        Execute one statement once per argument list, like sqlite3's executemany.
+        
+        Rows are sent ``batch_size`` at a time, one pipeline round-trip per
+        chunk, and the SQL text is stored once per chunk and run by id.
+        Raises RuntimeError if any statement fails, rather than dropping the
+        write; chunks sent before the failing one stay applied.
+        """
+        for start in range(0, len(args_list), batch_size):
+            results = self._pipeline(
+                [{'type': 'store_sql', 'sql_id': 1, 'sql': sql}]
+                + [self._statement(sql, args, 1) for args in args_list[start:start + batch_size]]
+            )
+            # The HTTP call succeeds even when individual statements fail
+            for result in results:
+                if result.get('type') == 'error':
+                    raise RuntimeError(result.get('error', {}).get('message', 'statement failed'))
+    
     def commit(self):
         """No-op for HTTP client (statements auto-commit)."""
         pass
     
     def close(self):
-        """No-op for HTTP client."""
-        pass
+        """Close the keep-alive HTTP connections."""
+        self.session.close()
 
 
 def get_db_connection():
@@ -121,42 +215,266 @@ def get_db_connection():
     Returns:
         Database connection object (TursoClient or sqlite3.Connection)
     """
-    turso_url = os.getenv('TURSO_DATABASE_URL')
-    turso_token = os.getenv('TURSO_AUTH_TOKEN')
-    
     # Try Turso first if credentials available
-    if turso_url and turso_token:
-        try:
-            client = TursoClient(turso_url, turso_token)
-            # Test connection
-            client.execute("SELECT 1")
-            logger.info("Connected to Turso remote database (HTTP API)")
-            return client
-        except Exception as e:
-            logger.warning(f"Failed to connect to Turso: {e}. Falling back to local SQLite.")
+    client = connect_turso()
+    if client is not None:
+        return client
     
     # Fallback to local SQLite
+    return connect_sqlite()
+
+
+def turso_configured() -> bool:
+    """Whether Turso credentials are set in the environment."""
+    return bool(os.getenv('TURSO_DATABASE_URL') and os.getenv('TURSO_AUTH_TOKEN'))
+
+
+def connect_turso() -> Optional[TursoClient]:
+    """Open and verify a Turso client, or return None if unconfigured or unreachable."""
+    if not turso_configured():
+        return None
+    
+    client = TursoClient(os.getenv('TURSO_DATABASE_URL'), os.getenv('TURSO_AUTH_TOKEN'))
+    try:
+        # Test connection
+        client.execute("SELECT 1")
+        logger.info("Connected to Turso remote database (HTTP API)")
+        return client
+    except Exception as e:
+        logger.warning(f"Failed to connect to Turso: {e}. Falling back to local SQLite.")
+        client.close()
+        return None
+
+
+def connect_sqlite() -> sqlite3.Connection:
+    """Open the local SQLite database (usable from any thread, one at a time)."""
     local_db_path = os.getenv('DATABASE_PATH', DEFAULT_LOCAL_DB)
-    conn = sqlite3.connect(local_db_path)
+    conn = sqlite3.connect(local_db_path, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    # Connections are pooled, so these are paid once per connection
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
     logger.info(f"Connected to local SQLite: {local_db_path}")
     return conn
 
 
+class ConnectionPool:
+    """
+    Reuses database connections across requests.
+    
+    Turso is used whenever it is configured and reachable. It is stateless
+    HTTP, so a single verified client is shared by every caller. SQLite
+    connections are kept in a bounded pool and lent to one thread at a time.
+    
+    If Turso is configured but can't be reached, either at startup or when a
+    request to it fails (see get_db), requests are served from SQLite and
+    Turso is probed again every TURSO_RETRY_SECONDS. The request that hit the
+    failure still fails; later ones use the local file until the probe
+    succeeds. Probes run outside the pool lock, so other threads keep getting
+    SQLite connections while one is in flight.
+    """
+    
+    def __init__(self, max_size: int = 8):
+        self.max_size = max_size
+        self.backend: Optional[str] = None  # 'turso' or 'sqlite' once resolved
+        self._turso: Optional[TursoClient] = None
+        self._turso_retry_at = 0.0
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._resolve_lock = threading.Lock()
+    
+    def acquire(self):
+        """Borrow a connection, opening one if the pool isn't full yet."""
+        if self.backend is None:
+            # First use: callers wait for the one initial probe, so nobody is
+            # handed the local file while a reachable Turso is configured
+            with self._resolve_lock:
+                if self.backend is None:
+                    self._probe_turso()
+        elif self.backend == 'sqlite' and turso_configured():
+            # Claim the retry under the lock so only one thread probes
+            with self._lock:
+                retry = time.monotonic() >= self._turso_retry_at
+                if retry:
+                    self._turso_retry_at = time.monotonic() + TURSO_RETRY_SECONDS
+            if retry:
+                self._probe_turso()
+        
+        with self._lock:
+            if self.backend == 'turso':
+                return self._turso
+            
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                if self._created < self.max_size:
+                    self._created += 1
+                    return connect_sqlite()
+        
+        # Pool exhausted: wait for another request to hand a connection back
+        return self._idle.get()
+    
+    def _probe_turso(self):
+        """Check Turso without holding the pool lock, then switch backends on the result."""
+        with self._lock:
+            client = self._turso
+            self._turso_retry_at = time.monotonic() + TURSO_RETRY_SECONDS
+        
+        if client is None:
+            client = connect_turso()
+        else:
+            # Reuse the client that failed earlier rather than opening another
+            try:
+                client.execute("SELECT 1")
+                logger.info("Turso reachable again")
+            except Exception as e:
+                logger.warning(f"Turso still unreachable: {e}")
+                client = None
+        
+        with self._lock:
+            if client is not None:
+                self._turso = client
+                self.backend = 'turso'
+            elif self.backend is None:
+                self.backend = 'sqlite'
+    
+    def mark_turso_failed(self):
+        """Serve SQLite until the next probe after a Turso request fails."""
+        with self._lock:
+            if self.backend == 'turso':
+                logger.warning("Turso request failed; using local SQLite until the next retry")
+                self.backend = 'sqlite'
+                self._turso_retry_at = time.monotonic() + TURSO_RETRY_SECONDS
+    
+    def release(self, conn):
+        """Return a borrowed connection to the pool."""
+        if isinstance(conn, TursoClient):
+            return
+        try:
+            conn.rollback()
+        except sqlite3.Error:
+            # Broken connection: drop it so a fresh one can be opened
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(conn)
+    
+    def close(self):
+        """Close idle connections and forget the resolved backend."""
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+            if self._turso is not None:
+                self._turso.close()
+            self.backend = None
+            self._turso = None
+            self._turso_retry_at = 0.0
+            self._created = 0
+
+
+_pool = ConnectionPool(max_size=DB_POOL_SIZE)
+
+
+def close_pool():
+    """Close pooled connections (on shutdown, or to pick up new settings)."""
+    _pool.close()
+
+
+# Database work runs on its own threads, one per pooled connection, instead
+# of asyncio's shared default executor. Extra callers queue here rather than
+# blocking inside ConnectionPool.acquire.
+_db_executor = ThreadPoolExecutor(max_workers=_pool.max_size, thread_name_prefix='db')
+
+
+async def run_in_db_thread(func, *args):
+    """Run a blocking database function on the DB executor and await its result."""
+    loop = asyncio.get_running_loop()
+    # Copy the context (as asyncio.to_thread does) so request timings still apply
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(_db_executor, functools.partial(ctx.run, func, *args))
+
+
+def _execute_sqlite(conn: sqlite3.Connection, sql: str, params: Sequence) -> Tuple[sqlite3.Cursor, List[str]]:
+    """
+    Execute on a plain-tuple cursor and return it with the column names.
+    
+    Zipping tuples with the names once per query is cheaper than building a
+    sqlite3.Row per row and then copying it into a dict.
+    """
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(sql, tuple(params))
+    columns = [col[0] for col in cursor.description] if cursor.description else []
+    return cursor, columns
+
+
+def query(conn, sql: str, params: Sequence = ()) -> List[Dict[str, Any]]:
+    """
+    Run a query against either backend and return rows as dicts.
+    
+    Turso already returns a list of dicts; SQLite rows are converted so
+    callers don't need to branch on the connection type.
+    """
+    with timed('db'):
+        if isinstance(conn, TursoClient):
+            return conn.execute(sql, list(params))
+        cursor, columns = _execute_sqlite(conn, sql, params)
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def iter_query(conn, sql: str, params: Sequence = (), batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+    """
+    Like query(), but yield rows as dicts while the caller consumes them.
+    
+    SQLite rows are pulled from the cursor ``batch_size`` at a time instead
+    of all at once. Turso returns the whole result in one HTTP response, so
+    its rows are simply iterated.
+    """
+    if isinstance(conn, TursoClient):
+        with timed('db'):
+            rows = conn.execute(sql, list(params))
+        yield from rows
+        return
+    
+    with timed('db'):
+        cursor, columns = _execute_sqlite(conn, sql, params)
+    while True:
+        with timed('db'):
+            batch = cursor.fetchmany(batch_size)
+        if not batch:
+            return
+        for row in batch:
+            yield dict(zip(columns, row))
+
+
 @contextmanager
 def get_db():
-    """Context manager for database connections."""
-    conn = get_db_connection()
+    """Context manager lending a pooled database connection."""
+    conn = _pool.acquire()
     try:
         yield conn
+    except requests.RequestException:
+        # Turso is unreachable or erroring: later requests fall back to SQLite
+        if isinstance(conn, TursoClient):
+            _pool.mark_turso_failed()
+        raise
     finally:
-        conn.close()
+        _pool.release(conn)
 
 
 def initialize_database():
     """Initialize database tables if they don't exist."""
-    conn = get_db_connection()
-    
+    with get_db() as conn:
+        _create_tables(conn)
+    logger.info("Database tables initialized")
+
+
+def _create_tables(conn):
+    """Create the tables and indexes on a pooled connection."""
     # Check if we're using Turso or SQLite
     is_turso = isinstance(conn, TursoClient)
     
@@ -176,16 +494,19 @@ def initialize_database():
             '''CREATE TABLE IF NOT EXISTS iv_history (
                 ticker TEXT NOT NULL,
                 date TEXT NOT NULL,
-                iv_30day REAL,
-                iv_60day REAL,
-                iv_90day REAL,
-                iv_52wk_high REAL,
-                iv_52wk_low REAL,
-                PRIMARY KEY (ticker, date)
+                atm_iv REAL,
+                expiration TEXT,
+                PRIMARY KEY (ticker, date, expiration)
+            )''',
+            '''CREATE TABLE IF NOT EXISTS iv_52wk_ranges (
+                ticker TEXT PRIMARY KEY,
+                high_52wk REAL,
+                low_52wk REAL,
+                updated_date TEXT
             )'''
         ]
-        for sql in create_statements:
-            conn.execute(sql)
+        # One pipeline round-trip for all the DDL instead of one per statement
+        conn.execute_batch([(sql, ()) for sql in create_statements + INDEX_STATEMENTS])
     else:
         # SQLite path
         cursor = conn.cursor()
@@ -205,31 +526,49 @@ def initialize_database():
             CREATE TABLE IF NOT EXISTS iv_history (
                 ticker TEXT NOT NULL,
                 date DATE NOT NULL,
-                iv_30day REAL,
-                iv_60day REAL,
-                iv_90day REAL,
-                iv_52wk_high REAL,
-                iv_52wk_low REAL,
-                PRIMARY KEY (ticker, date)
+                atm_iv REAL,
+                expiration TEXT,
+                PRIMARY KEY (ticker, date, expiration)
             )
         ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS iv_52wk_ranges (
+                ticker TEXT PRIMARY KEY,
+                high_52wk REAL,
+                low_52wk REAL,
+                updated_date DATE
+            )
+        ''')
+        for sql in INDEX_STATEMENTS:
+            cursor.execute(sql)
         conn.commit()
-    
-    conn.close()
-    logger.info("Database tables initialized")
 
 
-def test_connection() -> bool:
-    """Test database connection. Returns True if successful."""
-    try:
-        conn = get_db_connection()
+def ensure_indexes():
+    """Create the dashboard query indexes on an existing database (idempotent)."""
+    with get_db() as conn:
         if isinstance(conn, TursoClient):
-            conn.execute("SELECT 1")
+            conn.execute_batch([(sql, ()) for sql in INDEX_STATEMENTS])
         else:
             cursor = conn.cursor()
-            cursor.execute("SELECT 1")
-            cursor.fetchone()
-        conn.close()
+            for sql in INDEX_STATEMENTS:
+                cursor.execute(sql)
+            conn.commit()
+    logger.info("Database indexes verified")
+
+
+def test_connection() -> bool:
+    """Test database connection. Returns True if successful."""
+    try:
+        # Probes through the pool, so a resolved backend is reused rather
+        # than reconnected; the SELECT 1 still round-trips to the server
+        with get_db() as conn:
+            if isinstance(conn, TursoClient):
+                conn.execute("SELECT 1")
+            else:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
         return True
     except Exception as e:
         logger.error(f"Database connection test failed: {e}")
@@ -2,7 +2,8 @@
 Implied Volatility Calculator Module for Derivatives Dashboard
 
 Provides Black-Scholes option pricing and IV calculation using Newton-Raphson
-with bisection fallback method.
+with a bracketed fallback (Brent's method for single options, bisection for
+batches).
 Adapted from daily briefing system.
 """
 
@@ -13,6 +14,8 @@ from datetime import datetime, date, timedelta
 from typing import Optional, List, Dict, Tuple, Any
 from dataclasses import dataclass
 
+import numpy as np
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,15 +23,20 @@ logger = logging.getLogger(__name__)
 # Risk-free rate (default 4.5%)
 DEFAULT_RISK_FREE_RATE = 0.045
 
+# Normal distribution constants, computed once instead of on every call
+_INV_SQRT_2 = 1 / math.sqrt(2)
+_INV_SQRT_2PI = 1 / math.sqrt(2 * math.pi)
+
 
 def normal_cdf(x: float) -> float:
     """Cumulative distribution function for standard normal distribution."""
-    return 0.5 * (1 + math.erf(x / math.sqrt(2)))
+    # erfc keeps full precision in the lower tail, where 1 + erf(x) cancels
+    return 0.5 * math.erfc(-x * _INV_SQRT_2)
 
 
 def normal_pdf(x: float) -> float:
     """Probability density function for standard normal distribution."""
-    return (1 / math.sqrt(2 * math.pi)) * math.exp(-0.5 * x * x)
+    return _INV_SQRT_2PI * math.exp(-0.5 * x * x)
 
 
 def calculate_d1(S: float, K: float, T: float, r: float, sigma: float) -> float:
@@ -56,8 +64,14 @@ def black_scholes_price(S: float, K: float, T: float, r: float, sigma: float,
         sigma: Volatility/IV (decimal, e.g., 0.30 for 30%)
         option_type: 'call' or 'put'
     """
+    return _black_scholes_price(S, K, T, r, sigma, option_type.lower() == 'call')
+
+
+def _black_scholes_price(S: float, K: float, T: float, r: float, sigma: float,
+                         is_call: bool) -> float:
+    """black_scholes_price with the option type already resolved to a bool."""
     if T <= 0:
-        if option_type.lower() == 'call':
+        if is_call:
             return max(0, S - K)
         else:
             return max(0, K - S)
@@ -65,14 +79,16 @@ def black_scholes_price(S: float, K: float, T: float, r: float, sigma: float,
     if sigma <= 0:
         sigma = 0.0001
     
-    d1 = calculate_d1(S, K, T, r, sigma)
-    d2 = calculate_d2(d1, T, sigma)
-    disc_factor = math.exp(-r * T)
+    # Shared terms computed once (calculate_d1/d2 would each take sqrt(T))
+    sigma_sqrt_t = sigma * math.sqrt(T)
+    d1 = (math.log(S / K) + (r + 0.5 * sigma * sigma) * T) / sigma_sqrt_t
+    d2 = d1 - sigma_sqrt_t
+    disc_k = K * math.exp(-r * T)
     
-    if option_type.lower() == 'call':
-        price = S * normal_cdf(d1) - K * disc_factor * normal_cdf(d2)
+    if is_call:
+        price = S * normal_cdf(d1) - disc_k * normal_cdf(d2)
     else:
-        price = K * disc_factor * normal_cdf(-d2) - S * normal_cdf(-d1)
+        price = disc_k * normal_cdf(-d2) - S * normal_cdf(-d1)
     
     return max(0, price)
 
@@ -81,38 +97,128 @@ def calculate_vega(S: float, K: float, T: float, r: float, sigma: float) -> floa
     """Calculate option vega (sensitivity to volatility changes)."""
     if T <= 0 or sigma <= 0:
         return 0
-    d1 = calculate_d1(S, K, T, r, sigma)
-    vega = S * normal_pdf(d1) * math.sqrt(T)
+    # Same d1 as calculate_d1, sharing one sqrt(T) with the vega term
+    sqrt_t = math.sqrt(T)
+    d1 = (math.log(S / K) + (r + 0.5 * sigma * sigma) * T) / (sigma * sqrt_t)
+    vega = S * normal_pdf(d1) * sqrt_t
     return vega * 0.01  # Per 1% change
 
 
+def normal_cdf_array(x: np.ndarray) -> np.ndarray:
+    """
+    Standard normal CDF for an array (Numerical Recipes erfc approximation,
+    fractional error below 1.2e-7).
+    """
+    z = np.abs(x) * _INV_SQRT_2
+    t = 1.0 / (1.0 + 0.5 * z)
+    erfc = t * np.exp(-z * z - 1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (0.09678418 +
+           t * (-0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (1.48851587 +
+           t * (-0.82215223 + t * 0.17087277)))))))))
+    return np.where(x >= 0, 1.0 - 0.5 * erfc, 0.5 * erfc)
+
+
+def black_scholes_batch(S, K, T, r, sigma, is_call) -> Dict[str, np.ndarray]:
+    """
+    Price many options and their Greeks at once.
+    
+    Every argument may be a scalar or an array; they are broadcast together.
+    Uses the same conventions as the scalar functions: expired options are
+    worth intrinsic value, sigma <= 0 is treated as 0.0001 and vega is per
+    1% change. Theta is per calendar day.
+    
+    Args:
+        S: Current stock price(s)
+        K: Strike price(s)
+        T: Time(s) to expiration in years
+        r: Risk-free interest rate(s)
+        sigma: Volatility/IV (decimal)
+        is_call: True for calls, False for puts
+        
+    Returns:
+        Dict of 'price', 'delta', 'gamma', 'theta' and 'vega' arrays
+    """
+    S, K, T, r, sigma, is_call = np.broadcast_arrays(
+        np.asarray(S, dtype=float), np.asarray(K, dtype=float), np.asarray(T, dtype=float),
+        np.asarray(r, dtype=float), np.asarray(sigma, dtype=float), np.asarray(is_call, dtype=bool)
+    )
+    live = T > 0
+    # Placeholders keep the math finite for expired rows, which are overwritten below
+    T_live = np.where(live, T, 1.0)
+    sigma = np.where(sigma > 0, sigma, 0.0001)
+    
+    sqrt_t = np.sqrt(T_live)
+    sigma_sqrt_t = sigma * sqrt_t
+    d1 = (np.log(S / K) + (r + 0.5 * sigma * sigma) * T_live) / sigma_sqrt_t
+    d2 = d1 - sigma_sqrt_t
+    disc_k = K * np.exp(-r * T_live)
+    pdf_d1 = _INV_SQRT_2PI * np.exp(-0.5 * d1 * d1)
+    
+    # With sign = +1 for calls and -1 for puts, both option types share one
+    # formula: price = sign * (S * N(sign * d1) - K * exp(-rT) * N(sign * d2)).
+    # Evaluating N at sign * d also avoids the 1 - N(d) cancellation for
+    # deep out-of-the-money puts.
+    sign = np.where(is_call, 1.0, -1.0)
+    cdf_d1 = normal_cdf_array(sign * d1)
+    cdf_d2 = normal_cdf_array(sign * d2)
+    
+    price = sign * (S * cdf_d1 - disc_k * cdf_d2)
+    delta = sign * cdf_d1
+    gamma = pdf_d1 / (S * sigma_sqrt_t)
+    theta = (-S * pdf_d1 * sigma / (2 * sqrt_t) - sign * r * disc_k * cdf_d2) / 365.0
+    vega = S * pdf_d1 * sqrt_t * 0.01
+    
+    intrinsic = np.where(is_call, np.maximum(S - K, 0.0), np.maximum(K - S, 0.0))
+    expired_delta = np.where(intrinsic > 0, np.where(is_call, 1.0, -1.0), 0.0)
+    
+    return {
+        'price': np.where(live, np.maximum(price, 0.0), intrinsic),
+        'delta': np.where(live, delta, expired_delta),
+        'gamma': np.where(live, gamma, 0.0),
+        'theta': np.where(live, theta, 0.0),
+        'vega': np.where(live, vega, 0.0),
+    }
+
+
 def calculate_implied_vol(market_price: float, S: float, K: float, T: float, 
                           r: float, option_type: str,
                           max_iterations: int = 50,
                           price_tolerance: float = 0.01) -> Optional[float]:
     """
-    Calculate implied volatility from market price using Newton-Raphson + bisection fallback.
+    Calculate implied volatility from market price using Newton-Raphson + Brent fallback.
     
     Returns IV as decimal (e.g., 0.5231 for 52.31%) or None if calculation fails.
     """
     if market_price <= 0 or S <= 0 or K <= 0 or T <= 0:
         return None
     
+    # Resolve the option type once rather than on every pricing iteration
+    is_call = option_type.lower() == 'call'
+    
     # Check intrinsic value
-    intrinsic = max(0, S - K) if option_type.lower() == 'call' else max(0, K - S)
+    intrinsic = max(0, S - K) if is_call else max(0, K - S)
     if market_price < intrinsic:
         return None
     
-    # Newton-Raphson method
+    # Newton-Raphson method. Price and vega share d1, and the terms that
+    # don't depend on sigma are computed once outside the loop.
+    sqrt_t = math.sqrt(T)
+    log_moneyness = math.log(S / K)
+    disc_k = K * math.exp(-r * T)
     sigma = 0.5
     for i in range(max_iterations):
-        theoretical_price = black_scholes_price(S, K, T, r, sigma, option_type)
-        price_diff = theoretical_price - market_price
+        sigma_sqrt_t = sigma * sqrt_t
+        d1 = (log_moneyness + (r + 0.5 * sigma * sigma) * T) / sigma_sqrt_t
+        d2 = d1 - sigma_sqrt_t
+        if is_call:
+            theoretical_price = S * normal_cdf(d1) - disc_k * normal_cdf(d2)
+        else:
+            theoretical_price = disc_k * normal_cdf(-d2) - S * normal_cdf(-d1)
+        price_diff = max(0, theoretical_price) - market_price
         
         if abs(price_diff) < price_tolerance:
             return sigma
         
-        vega = calculate_vega(S, K, T, r, sigma)
+        vega = S * normal_pdf(d1) * sqrt_t * 0.01  # Per 1% change, as calculate_vega
         if abs(vega) < 1e-10:
             break
         
@@ -121,51 +227,257 @@ def calculate_implied_vol(market_price: float, S: float, K: float, T: float,
             break
         sigma = sigma_new
     
-    # Bisection fallback
-    sigma_low, sigma_high = 0.001, 3.0
+    # Brent's method fallback over the same bracket bisection used
+    return _brent_implied_vol(market_price, S, K, T, r, is_call, 0.001, 3.0,
+                              max_iterations, price_tolerance)
+
+
+@dataclass
+class IVResult:
+    """Implied volatility and the Greeks evaluated at that volatility."""
+    iv: float
+    delta: float
+    gamma: float
+    theta: float  # Per calendar day
+    vega: float  # Per 1% change
+
+
+def calculate_iv_with_greeks(market_price: float, S: float, K: float, T: float,
+                             r: float, option_type: str,
+                             max_iterations: int = 50,
+                             price_tolerance: float = 0.01) -> Optional[IVResult]:
+    """
+    Calculate implied volatility and the option's Greeks in one call.
+    
+    All Greeks come from a single d1/d2 evaluation at the solved volatility
+    rather than separate pricing calls; conventions match black_scholes_batch.
+    Returns None if the volatility can't be solved.
+    """
+    sigma = calculate_implied_vol(market_price, S, K, T, r, option_type,
+                                  max_iterations, price_tolerance)
+    if sigma is None:
+        return None
+    
+    sign = 1.0 if option_type.lower() == 'call' else -1.0
+    sqrt_t = math.sqrt(T)
+    sigma_sqrt_t = sigma * sqrt_t
+    d1 = (math.log(S / K) + (r + 0.5 * sigma * sigma) * T) / sigma_sqrt_t
+    d2 = d1 - sigma_sqrt_t
+    disc_k = K * math.exp(-r * T)
+    pdf_d1 = normal_pdf(d1)
+    
+    return IVResult(
+        iv=sigma,
+        delta=sign * normal_cdf(sign * d1),
+        gamma=pdf_d1 / (S * sigma_sqrt_t),
+        theta=(-S * pdf_d1 * sigma / (2 * sqrt_t) - sign * r * disc_k * normal_cdf(sign * d2)) / 365.0,
+        vega=S * pdf_d1 * sqrt_t * 0.01
+    )
+
+
+def _brent_implied_vol(market_price: float, S: float, K: float, T: float, r: float,
+                       is_call: bool, sigma_low: float, sigma_high: float,
+                       max_iterations: int, price_tolerance: float,
+                       sigma_tolerance: float = 0.0001) -> Optional[float]:
+    """
+    Solve for IV with Brent's method (Numerical Recipes zbrent).
+    
+    Keeps bisection's guaranteed bracket but takes inverse-quadratic or
+    secant steps when they stay inside it, so it needs far fewer pricings
+    than halving the bracket. Returns None when the bracket doesn't contain
+    the market price.
+    """
+    a, b = sigma_low, sigma_high
+    fa = _black_scholes_price(S, K, T, r, a, is_call) - market_price
+    fb = _black_scholes_price(S, K, T, r, b, is_call) - market_price
+    if abs(fa) < price_tolerance:
+        return a
+    if abs(fb) < price_tolerance:
+        return b
+    if (fa > 0) == (fb > 0):
+        return None
+    
+    c, fc = b, fb
+    d = e = b - a
     for i in range(max_iterations):
-        sigma = (sigma_low + sigma_high) / 2
-        theoretical_price = black_scholes_price(S, K, T, r, sigma, option_type)
-        price_diff = theoretical_price - market_price
+        # Keep the root bracketed between b and c, with b the best estimate
+        if (fb > 0) == (fc > 0):
+            c, fc = a, fa
+            d = e = b - a
+        if abs(fc) < abs(fb):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
         
-        if abs(price_diff) < price_tolerance:
-            return sigma
+        tol = 2 * 2.2e-16 * abs(b) + 0.5 * sigma_tolerance
+        half_width = 0.5 * (c - b)
+        if abs(half_width) <= tol or abs(fb) < price_tolerance:
+            return b
         
-        if price_diff > 0:
-            sigma_high = sigma
+        if abs(e) >= tol and abs(fa) > abs(fb):
+            # Try inverse quadratic interpolation, or secant with two points
+            s = fb / fa
+            if a == c:
+                p = 2 * half_width * s
+                q = 1 - s
+            else:
+                q = fa / fc
+                t = fb / fc
+                p = s * (2 * half_width * q * (q - t) - (b - a) * (t - 1))
+                q = (q - 1) * (t - 1) * (s - 1)
+            if p > 0:
+                q = -q
+            p = abs(p)
+            if 2 * p < min(3 * half_width * q - abs(tol * q), abs(e * q)):
+                e, d = d, p / q
+            else:
+                d = e = half_width
         else:
-            sigma_low = sigma
+            d = e = half_width
         
-        if sigma_high - sigma_low < 0.0001:
-            return sigma
+        a, fa = b, fb
+        b += d if abs(d) > tol else math.copysign(tol, half_width)
+        fb = _black_scholes_price(S, K, T, r, b, is_call) - market_price
     
     return None
 
 
+def calculate_iv_batch(market_prices, S, K, T, r, is_call,
+                       max_iterations: int = 50,
+                       price_tolerance: float = 0.01) -> np.ndarray:
+    """
+    Calculate implied volatility for many options at once.
+    
+    Vectorized version of calculate_implied_vol: each Newton-Raphson step
+    prices every unsolved option in one black_scholes_batch call, and rows
+    Newton can't solve go through a vectorized bisection. Newton starts from
+    the Brenner-Subrahmanyam approximation sigma ~ sqrt(2*pi/T) * price / S
+    rather than a flat guess, which saves several iterations near the money.
+    
+    The fallback uses the same 0.001-3.0 bracket as the scalar Brent fallback
+    and gives up on rows the bracket doesn't contain. Because Newton starts
+    from a different guess, a row that only Newton can solve (an IV outside
+    the bracket, as with ill-conditioned deep in-the-money options near
+    expiry) may still come out solved in one function and unsolved in the
+    other.
+    
+    Arguments broadcast like black_scholes_batch; scalars are treated as one
+    option. Returns an array (at least 1-D) of IVs as decimals, with NaN for
+    invalid inputs and rows that couldn't be solved.
+    """
+    market_prices, S, K, T, r, is_call = (np.atleast_1d(arr) for arr in np.broadcast_arrays(
+        np.asarray(market_prices, dtype=float), np.asarray(S, dtype=float), np.asarray(K, dtype=float),
+        np.asarray(T, dtype=float), np.asarray(r, dtype=float), np.asarray(is_call, dtype=bool)
+    ))
+    intrinsic = np.where(is_call, np.maximum(S - K, 0.0), np.maximum(K - S, 0.0))
+    valid = (market_prices > 0) & (S > 0) & (K > 0) & (T > 0) & (market_prices >= intrinsic)
+    iv = np.full(market_prices.shape, np.nan)
+    
+    # Newton-Raphson method over the still-unsolved rows
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma = np.clip(np.sqrt(2 * math.pi / T) * market_prices / S, 0.01, 3.0)
+    active = valid.copy()
+    for i in range(max_iterations):
+        idx = np.flatnonzero(active)
+        if not idx.size:
+            break
+        
+        result = black_scholes_batch(S[idx], K[idx], T[idx], r[idx], sigma[idx], is_call[idx])
+        price_diff = result['price'] - market_prices[idx]
+        converged = np.abs(price_diff) < price_tolerance
+        iv[idx[converged]] = sigma[idx[converged]]
+        
+        with np.errstate(divide='ignore', over='ignore', invalid='ignore'):
+            sigma_new = sigma[idx] - price_diff / (result['vega'] * 100)
+        failed = ~converged & ((np.abs(result['vega']) < 1e-10) | ~(sigma_new > 0) | (sigma_new > 5.0))
+        stopped = converged | failed
+        sigma[idx] = np.where(stopped, sigma[idx], sigma_new)
+        active[idx[stopped]] = False
+    
+    # Bisection fallback over the bracket _brent_implied_vol uses. As there, an
+    # endpoint within tolerance is the answer and a bracket whose ends price on
+    # the same side of the market has no root, so the row stays NaN.
+    idx = np.flatnonzero(valid & np.isnan(iv))
+    sigma_low = np.full(idx.size, 0.001)
+    sigma_high = np.full(idx.size, 3.0)
+    if idx.size:
+        diff_low = black_scholes_batch(S[idx], K[idx], T[idx], r[idx], sigma_low, is_call[idx])['price'] - market_prices[idx]
+        diff_high = black_scholes_batch(S[idx], K[idx], T[idx], r[idx], sigma_high, is_call[idx])['price'] - market_prices[idx]
+        low_ok = np.abs(diff_low) < price_tolerance
+        high_ok = ~low_ok & (np.abs(diff_high) < price_tolerance)
+        iv[idx[low_ok]] = sigma_low[low_ok]
+        iv[idx[high_ok]] = sigma_high[high_ok]
+        bracketed = ~low_ok & ~high_ok & ((diff_low > 0) != (diff_high > 0))
+        idx, sigma_low, sigma_high = idx[bracketed], sigma_low[bracketed], sigma_high[bracketed]
+    for i in range(max_iterations):
+        if not idx.size:
+            break
+        
+        sigma = (sigma_low + sigma_high) / 2
+        result = black_scholes_batch(S[idx], K[idx], T[idx], r[idx], sigma, is_call[idx])
+        price_diff = result['price'] - market_prices[idx]
+        
+        sigma_high = np.where(price_diff > 0, sigma, sigma_high)
+        sigma_low = np.where(price_diff > 0, sigma_low, sigma)
+        done = (np.abs(price_diff) < price_tolerance) | (sigma_high - sigma_low < 0.0001)
+        iv[idx[done]] = sigma[done]
+        idx, sigma_low, sigma_high = idx[~done], sigma_low[~done], sigma_high[~done]
+    
+    return iv
+
+
 def find_atm_options(chain: List[Any], stock_price: float, strike_range: int = 2) -> List[Any]:
     """Filter options to find at-the-money options within range."""
     if not chain:
         return []
     
-    strikes = sorted(set(opt.strike for opt in chain))
-    if not strikes:
-        return []
-    
-    atm_strike = min(strikes, key=lambda s: abs(s - stock_price))
-    atm_idx = strikes.index(atm_strike)
+    # Sorted unique strikes; argmin takes the lower strike on a tie, as min() did
+    strikes = np.unique(np.fromiter((opt.strike for opt in chain), dtype=float, count=len(chain)))
+    atm_idx = int(np.abs(strikes - stock_price).argmin())
     start_idx = max(0, atm_idx - strike_range)
-    end_idx = min(len(strikes), atm_idx + strike_range + 1)
-    target_strikes = set(strikes[start_idx:end_idx])
+    end_idx = atm_idx + strike_range + 1
+    target_strikes = set(strikes[start_idx:end_idx].tolist())
     
     return [opt for opt in chain if opt.strike in target_strikes]
 
 
+@dataclass
+class ChainArrays:
+    """An option chain as one NumPy array per field, built in a single pass."""
+    strike: np.ndarray
+    expiration: np.ndarray  # datetime64[D]
+    bid: np.ndarray
+    ask: np.ndarray
+    last_price: np.ndarray
+    is_call: np.ndarray
+    
+    @classmethod
+    def from_list(cls, chain: List[Any]) -> 'ChainArrays':
+        """Extract the columns from OptionChainEntry-like objects."""
+        strike, expiration, bid, ask, last_price, is_call = zip(*(
+            (opt.strike, opt.expiration, opt.bid, opt.ask, opt.last_price,
+             opt.option_type.lower() == 'call')
+            for opt in chain
+        ))
+        return cls(
+            strike=np.array(strike, dtype=float),
+            expiration=np.array(expiration, dtype='datetime64[D]'),
+            bid=np.array(bid, dtype=float),
+            ask=np.array(ask, dtype=float),
+            last_price=np.array(last_price, dtype=float),
+            is_call=np.array(is_call, dtype=bool),
+        )
+
+
 def get_atm_iv_from_chain(option_chain: List[Any], stock_price: float,
                           target_dte: int = 35, dte_range: int = 15,
                           r: float = DEFAULT_RISK_FREE_RATE) -> Optional[float]:
     """
     Extract ATM implied volatility from option chain.
     
+    The chain is converted to columns once; choosing the expiration, the ATM
+    strikes and the quoted prices are then array operations, and the IVs are
+    solved in a single batch.
+    
     Args:
         option_chain: List of OptionChainEntry objects
         stock_price: Current stock price
@@ -179,69 +491,41 @@ def get_atm_iv_from_chain(option_chain: List[Any], stock_price: float,
     if not option_chain or stock_price <= 0:
         return None
     
-    from datetime import date
-    today = date.today()
+    chain = ChainArrays.from_list(option_chain)
     
-    # Group by expiration
-    expirations: Dict[date, List[Any]] = {}
-    for opt in option_chain:
-        if opt.expiration not in expirations:
-            expirations[opt.expiration] = []
-        expirations[opt.expiration].append(opt)
-    
-    if not expirations:
+    # Find best expiration: the future expiry closest to target_dte (earliest on
+    # a tie). An expiry within dte_range is always the closest one when any
+    # exists, so the range needs no separate pass.
+    expirations = np.unique(chain.expiration)
+    dtes = (expirations - np.datetime64(date.today(), 'D')).astype(int)
+    future = dtes > 0
+    if not future.any():
         return None
+    best = int(np.argmin(np.where(future, np.abs(dtes - target_dte), np.iinfo(np.int64).max)))
+    T = dtes[best] / 365.0
+    in_expiry = chain.expiration == expirations[best]
     
-    # Find best expiration
-    best_exp = None
-    best_dte_diff = float('inf')
-    
-    for exp in sorted(expirations.keys()):
-        if exp <= today:
-            continue
-        dte = (exp - today).days
-        if abs(dte - target_dte) <= dte_range:
-            if abs(dte - target_dte) < best_dte_diff:
-                best_dte_diff = abs(dte - target_dte)
-                best_exp = exp
-    
-    if not best_exp:
-        future_exps = [exp for exp in expirations.keys() if exp > today]
-        if not future_exps:
-            return None
-        best_exp = min(future_exps, key=lambda e: abs((e - today).days - target_dte))
-    
-    exp_options = expirations[best_exp]
-    dte = (best_exp - today).days
-    T = dte / 365.0
-    
-    # Find ATM options
-    atm_options = find_atm_options(exp_options, stock_price, strike_range=2)
-    if not atm_options:
-        return None
+    # Find ATM options (same window as find_atm_options)
+    strikes = np.unique(chain.strike[in_expiry])
+    atm_idx = int(np.abs(strikes - stock_price).argmin())
+    atm = in_expiry & np.isin(chain.strike, strikes[max(0, atm_idx - 2):atm_idx + 3])
     
-    # Calculate IV for each ATM option
-    iv_values = []
-    for opt in atm_options:
-        if opt.bid > 0 and opt.ask > 0:
-            market_price = (opt.bid + opt.ask) / 2
-        elif opt.last_price > 0:
-            market_price = opt.last_price
-        else:
-            continue
-        
-        if market_price < 0.10:
-            continue
-        
-        iv = calculate_implied_vol(market_price, stock_price, opt.strike, T, r, opt.option_type)
-        if iv and 0.05 <= iv <= 2.0:
-            iv_values.append({'strike': opt.strike, 'iv': iv, 'distance': abs(opt.strike - stock_price)})
+    # Mid price when both sides are quoted, else last trade; skip sub-dime quotes
+    market_prices = np.where((chain.bid > 0) & (chain.ask > 0),
+                             (chain.bid + chain.ask) / 2, chain.last_price)
+    priced = atm & (market_prices >= 0.10)
+    if not priced.any():
+        return None
     
-    if not iv_values:
+    strikes = chain.strike[priced]
+    ivs = calculate_iv_batch(market_prices[priced], stock_price, strikes, T, r, chain.is_call[priced])
+    # NaN (unsolved) compares False, so it is dropped along with outliers
+    valid = (ivs >= 0.05) & (ivs <= 2.0)
+    if not valid.any():
         return None
     
     # Weight by inverse distance from ATM
-    total_weight = sum(1 / (1 + v['distance'] / stock_price) for v in iv_values)
-    weighted_iv = sum(v['iv'] * (1 / (1 + v['distance'] / stock_price)) for v in iv_values) / total_weight
+    weights = 1 / (1 + np.abs(strikes[valid] - stock_price) / stock_price)
+    weighted_iv = float(np.dot(ivs[valid], weights) / weights.sum())
     
     return weighted_iv
@@ -2,8 +2,8 @@
 Market Data Module for Derivatives Dashboard
 
 Fetches live market data from:
-- yfinance: stock prices, earnings dates
-- Alpaca API (HTTP): options chains, option prices
+- yfinance: earnings dates, batch stock prices, stock price fallback
+- Alpaca API (HTTP): options chains, option prices, stock prices
 
 Falls back to cached/generated data if APIs fail.
 Adapted from daily briefing system.
@@ -12,10 +12,20 @@ Adapted from daily briefing system.
 import os
 import re
 import logging
+import threading
+from bisect import bisect_left
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date, timedelta
+from operator import attrgetter
 from typing import Optional, List, Dict, Any, Tuple
 from dataclasses import dataclass
+from functools import lru_cache
+
+from services.cache import TTLCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -31,12 +41,52 @@ except ImportError:
 
 # Alpaca API Configuration
 ALPACA_DATA_URL = "https://data.alpaca.markets/v1beta1"
+ALPACA_STOCKS_URL = "https://data.alpaca.markets/v2/stocks"
+
+# Shared keep-alive session for Alpaca calls, so each snapshot request reuses
+# a pooled TLS connection instead of handshaking again. The snapshot calls
+# are GETs, so rate-limit and server errors are safe to retry.
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+))
+
+# OCC option symbol: root, YYMMDD expiration, C/P, strike x 1000 (8 digits)
+_OCC_SYMBOL_RE = re.compile(r'^([A-Z]+)(\d{6})([CP])(\d{8})$')
+
+# Concurrent option-chain fetches; each request mostly waits on Alpaca
+OPTION_CHAIN_WORKERS = 8
+
+# Recent stock prices, so dashboard refreshes within a minute don't go back
+# to Alpaca or yfinance (and its rate limits) for every symbol. Price lookups
+# can run on several threads at once, hence the lock.
+PRICE_CACHE_SECONDS = 60
+_price_cache = TTLCache(max_size=256)
+_price_cache_lock = threading.Lock()
+
+# Option chains and earnings dates, cached the same way. Quotes move, so
+# chains are only reused briefly; earnings dates change at most daily.
+OPTION_CHAIN_CACHE_SECONDS = 30
+EARNINGS_CACHE_SECONDS = 86400
+_chain_cache = TTLCache(max_size=256)
+_earnings_cache = TTLCache(max_size=256)
+_market_cache_lock = threading.Lock()
 
+# Per-type strike indexes for cached chains, so repricing many contracts of
+# one ticker bisects the strikes instead of scanning the chain each time
+_chain_index_cache = TTLCache(max_size=256)
 
+
+@lru_cache(maxsize=1)
 def get_alpaca_headers() -> Optional[Dict[str, str]]:
     """
     Get Alpaca API authentication headers.
     Uses environment variables ALPACA_API_KEY and ALPACA_API_SECRET.
+    
+    The result is cached for the life of the process; call
+    get_alpaca_headers.cache_clear() after changing the credentials.
     """
     api_key = os.getenv('ALPACA_API_KEY')
     api_secret = os.getenv('ALPACA_API_SECRET')
@@ -51,7 +101,7 @@ def get_alpaca_headers() -> Optional[Dict[str, str]]:
     }
 
 
-@dataclass
+@dataclass(slots=True)
 class OptionChainEntry:
     """Represents a single option contract in the chain."""
     strike: float
@@ -76,7 +126,7 @@ class OptionChainEntry:
 
 def get_stock_price(ticker: str) -> Optional[float]:
     """
-    Get current stock price using yfinance.
+    Get current stock price from Alpaca, falling back to yfinance.
     
     Args:
         ticker: Stock symbol (e.g., 'AAPL', 'AMD')
@@ -84,6 +134,55 @@ def get_stock_price(ticker: str) -> Optional[float]:
     Returns:
         Current stock price or None if unavailable
     """
+    with _price_cache_lock:
+        cached = _price_cache.get(ticker)
+    if cached is not None:
+        return cached
+    
+    price = _fetch_alpaca_stock_price(ticker)
+    if price is None:
+        price = _fetch_yfinance_stock_price(ticker)
+    
+    if price is not None:
+        with _price_cache_lock:
+            _price_cache.set(ticker, price, ttl_seconds=PRICE_CACHE_SECONDS)
+    return price
+
+
+def _fetch_alpaca_stock_price(ticker: str) -> Optional[float]:
+    """
+    Get the latest trade price from Alpaca's stock snapshot.
+    
+    Uses the same pooled session and credentials as the option chains, and
+    returns a single float without building a DataFrame like yfinance does.
+    """
+    headers = get_alpaca_headers()
+    if not headers:
+        return None
+    
+    try:
+        response = _SESSION.get(
+            f"{ALPACA_STOCKS_URL}/{ticker}/snapshot",
+            headers=headers,
+            params={'feed': 'iex'},
+            timeout=5
+        )
+        if response.status_code != 200:
+            logger.warning(f"Alpaca stock snapshot error for {ticker}: {response.status_code}")
+            return None
+        
+        snapshot = orjson.loads(response.content)
+        price = float((snapshot.get('latestTrade') or {}).get('p', 0) or 0)
+        if not price:
+            price = float((snapshot.get('dailyBar') or {}).get('c', 0) or 0)
+        return price or None
+    except Exception as e:
+        logger.error(f"Error fetching Alpaca stock price for {ticker}: {e}")
+        return None
+
+
+def _fetch_yfinance_stock_price(ticker: str) -> Optional[float]:
+    """Get the latest close from yfinance."""
     if not YFINANCE_AVAILABLE:
         logger.warning(f"yfinance not available for {ticker}")
         return None
@@ -95,19 +194,62 @@ def get_stock_price(ticker: str) -> Optional[float]:
             return float(hist['Close'].iloc[-1])
         
         info = stock.fast_info
-        if info and hasattr(info, 'last_price'):
-            return float(info.last_price)
-        
-        return None
+        if not (info and hasattr(info, 'last_price')):
+            return None
+        return float(info.last_price)
     except Exception as e:
         logger.error(f"Error fetching stock price for {ticker}: {e}")
         return None
 
 
+def get_stock_prices(tickers: List[str]) -> Dict[str, float]:
+    """
+    Get current stock prices for several tickers with one yfinance download.
+    
+    Args:
+        tickers: Stock symbols (e.g., ['AAPL', 'AMD'])
+        
+    Returns:
+        Dict of ticker -> price, in the order given; tickers without data are omitted
+    """
+    if not YFINANCE_AVAILABLE:
+        logger.warning("yfinance not available for batch price lookup")
+        return {}
+    
+    if not tickers:
+        return {}
+    
+    # Only tickers without a fresh cached price are downloaded
+    with _price_cache_lock:
+        cached = {ticker: _price_cache.get(ticker) for ticker in tickers}
+    missing = [ticker for ticker, price in cached.items() if price is None]
+    
+    if missing:
+        try:
+            data = yf.download(missing, period="1d", progress=False)
+            closes = data['Close']
+            
+            with _price_cache_lock:
+                for ticker in missing:
+                    # A single ticker may come back as a Series rather than a column
+                    series = closes[ticker] if hasattr(closes, 'columns') else closes
+                    series = series.dropna()
+                    if not series.empty:
+                        cached[ticker] = float(series.iloc[-1])
+                        _price_cache.set(ticker, cached[ticker], ttl_seconds=PRICE_CACHE_SECONDS)
+        except Exception as e:
+            logger.error(f"Error fetching stock prices for {missing}: {e}")
+    
+    return {ticker: price for ticker, price in cached.items() if price is not None}
+
+
 def get_option_chain(ticker: str, expiration: Optional[date] = None) -> List[OptionChainEntry]:
     """
     Get option chain for a ticker using Alpaca HTTP API.
     
+    Chains are reused for OPTION_CHAIN_CACHE_SECONDS; failed or empty fetches
+    aren't cached, so the next call tries again.
+    
     Args:
         ticker: Stock symbol
         expiration: Optional specific expiration date
@@ -115,6 +257,21 @@ def get_option_chain(ticker: str, expiration: Optional[date] = None) -> List[Opt
     Returns:
         List of OptionChainEntry objects
     """
+    cache_key = f"{ticker}:{expiration}"
+    with _market_cache_lock:
+        cached = _chain_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    options = _fetch_option_chain(ticker, expiration)
+    if options:
+        with _market_cache_lock:
+            _chain_cache.set(cache_key, options, ttl_seconds=OPTION_CHAIN_CACHE_SECONDS)
+    return options
+
+
+def _fetch_option_chain(ticker: str, expiration: Optional[date] = None) -> List[OptionChainEntry]:
+    """Fetch and parse an option chain from Alpaca, bypassing the cache."""
     headers = get_alpaca_headers()
     if not headers:
         logger.warning(f"Alpaca credentials not available for {ticker}")
@@ -128,38 +285,46 @@ def get_option_chain(ticker: str, expiration: Optional[date] = None) -> List[Opt
         }
         
         if expiration:
-            params['expiration_date'] = expiration.strftime('%Y-%m-%d')
+            params['expiration_date'] = expiration.isoformat()
         
         logger.info(f"Fetching options for {ticker} from Alpaca...")
-        response = requests.get(url, headers=headers, params=params, timeout=30)
+        response = _SESSION.get(url, headers=headers, params=params, timeout=30)
         
         if response.status_code != 200:
             logger.error(f"Alpaca API error: {response.status_code}")
             return []
         
-        data = response.json()
+        # A full chain is a large nested payload; orjson decodes it several
+        # times faster than response.json()
+        data = orjson.loads(response.content)
         snapshots = data.get('snapshots', {})
         
         if not snapshots:
             return []
         
+        # A chain has a handful of expirations shared by hundreds of contracts,
+        # so each date code is turned into a date once
+        expiration_dates: Dict[str, date] = {}
+        expiration_code = expiration.strftime('%y%m%d') if expiration else None
+        
         options = []
         for option_symbol, snapshot in snapshots.items():
             try:
-                # Parse option symbol
-                match = re.match(r'^([A-Z]+)(\d{6})([CP])(\d{8})$', option_symbol.upper())
+                # Parse option symbol (Alpaca already returns them uppercase)
+                match = _OCC_SYMBOL_RE.match(option_symbol)
                 if not match:
                     continue
                 
-                underlying = match.group(1)
-                date_code = match.group(2)
-                opt_type_code = match.group(3)
-                strike_code = match.group(4)
+                underlying, date_code, opt_type_code, strike_code = match.groups()
+                
+                # Other expirations are skipped before their quotes are read
+                if expiration_code and date_code != expiration_code:
+                    continue
                 
-                exp_year = 2000 + int(date_code[0:2])
-                exp_month = int(date_code[2:4])
-                exp_day = int(date_code[4:6])
-                parsed_date = date(exp_year, exp_month, exp_day)
+                parsed_date = expiration_dates.get(date_code)
+                if parsed_date is None:
+                    parsed_date = date(2000 + int(date_code[0:2]), int(date_code[2:4]), int(date_code[4:6]))
+                    expiration_dates[date_code] = parsed_date
                 
                 option_type = 'call' if opt_type_code == 'C' else 'put'
                 strike = int(strike_code) / 1000.0
@@ -178,9 +343,6 @@ def get_option_chain(ticker: str, expiration: Optional[date] = None) -> List[Opt
                 open_interest = snapshot.get('open_interest')
                 volume = snapshot.get('volume')
                 
-                if expiration and parsed_date != expiration:
-                    continue
-                
                 options.append(OptionChainEntry(
                     strike=strike,
                     expiration=parsed_date,
@@ -199,7 +361,7 @@ def get_option_chain(ticker: str, expiration: Optional[date] = None) -> List[Opt
                 logger.warning(f"Error parsing option {option_symbol}: {e}")
                 continue
         
-        options.sort(key=lambda x: (x.expiration, x.strike, x.option_type))
+        options.sort(key=attrgetter('expiration', 'strike', 'option_type'))
         logger.info(f"Retrieved {len(options)} options for {ticker}")
         return options
         
@@ -211,36 +373,106 @@ def get_option_chain(ticker: str, expiration: Optional[date] = None) -> List[Opt
         return []
 
 
+def get_option_chains(tickers: List[str],
+                      expiration: Optional[date] = None) -> Dict[str, List[OptionChainEntry]]:
+    """
+    Get option chains for several tickers concurrently.
+    
+    Each chain is fetched with get_option_chain on a worker thread sharing the
+    pooled session, so the total wait is roughly the slowest request rather
+    than the sum of all of them.
+    
+    Args:
+        tickers: Stock symbols
+        expiration: Optional specific expiration date
+        
+    Returns:
+        Dict of ticker -> chain, in the order given (empty list on failure)
+    """
+    if not tickers:
+        return {}
+    
+    with ThreadPoolExecutor(max_workers=min(OPTION_CHAIN_WORKERS, len(tickers))) as executor:
+        chains = executor.map(lambda ticker: get_option_chain(ticker, expiration), tickers)
+        return dict(zip(tickers, chains))
+
+
 def get_nearest_strike(chain: List[OptionChainEntry], target_strike: float, 
                         option_type: str) -> Optional[OptionChainEntry]:
     """Find the option in the chain with the strike nearest to target."""
-    filtered = [opt for opt in chain if opt.option_type.lower() == option_type.lower()]
-    if not filtered:
-        return None
-    return min(filtered, key=lambda opt: abs(opt.strike - target_strike))
+    # Chain entries are parsed with lowercase types, so only the target is normalized
+    option_type = option_type.lower()
+    return min(
+        (opt for opt in chain if opt.option_type == option_type),
+        key=lambda opt: abs(opt.strike - target_strike),
+        default=None
+    )
 
 
-def get_option_by_details(ticker: str, strike: float, option_type: str, 
-                          expiration: date) -> Optional[OptionChainEntry]:
-    """Get a specific option contract matching exact details."""
+def _build_strike_index(chain: List[OptionChainEntry]) -> Dict[str, Tuple[List[float], List[OptionChainEntry]]]:
+    """Split a chain by option type into strike-sorted (strikes, entries) pairs."""
+    index = {}
+    for option_type in ('call', 'put'):
+        # Stable sort, so equal strikes keep the chain's earliest-expiry-first order
+        entries = sorted((opt for opt in chain if opt.option_type == option_type), key=attrgetter('strike'))
+        index[option_type] = ([opt.strike for opt in entries], entries)
+    return index
+
+
+def _get_strike_index(ticker: str, expiration: Optional[date]) -> Optional[Dict[str, Tuple[List[float], List[OptionChainEntry]]]]:
+    """Return the strike index for the cached chain, building it on first use."""
     chain = get_option_chain(ticker, expiration)
     if not chain:
         return None
     
-    option_type = option_type.lower().rstrip('s')
+    cache_key = f"{ticker}:{expiration}"
+    with _market_cache_lock:
+        cached = _chain_index_cache.get(cache_key)
+    # The index is only valid for the chain object it was built from
+    if cached is not None and cached[0] is chain:
+        return cached[1]
+    
+    index = _build_strike_index(chain)
+    with _market_cache_lock:
+        _chain_index_cache.set(cache_key, (chain, index), ttl_seconds=OPTION_CHAIN_CACHE_SECONDS)
+    return index
+
+
+def _nearest_in_index(index: Dict[str, Tuple[List[float], List[OptionChainEntry]]], target_strike: float,
+                      option_type: str) -> Optional[OptionChainEntry]:
+    """Bisect a strike index for the nearest contract, matching get_nearest_strike."""
+    strikes, entries = index.get(option_type, ([], []))
+    if not strikes:
+        return None
+    
+    i = bisect_left(strikes, target_strike)
+    if i == len(strikes):
+        return entries[bisect_left(strikes, strikes[-1])]
+    above = entries[i]
+    if i == 0:
+        return above
+    below = entries[bisect_left(strikes, strikes[i - 1])]
     
-    for opt in chain:
-        if (abs(opt.strike - strike) < 0.01 and 
-            opt.option_type == option_type and 
-            opt.expiration == expiration):
-            return opt
+    distance_above = above.strike - target_strike
+    distance_below = target_strike - below.strike
+    if distance_above != distance_below:
+        return above if distance_above < distance_below else below
+    # On a tie, take whichever comes first in the (expiration, strike) sorted chain
+    return min(below, above, key=attrgetter('expiration', 'strike'))
+
+
+def get_option_by_details(ticker: str, strike: float, option_type: str, 
+                          expiration: date) -> Optional[OptionChainEntry]:
+    """Get a specific option contract matching exact details."""
+    index = _get_strike_index(ticker, expiration)
+    if not index:
+        return None
     
-    # Find nearest if no exact match
-    filtered = [opt for opt in chain if opt.option_type == option_type]
-    if filtered:
-        closest = min(filtered, key=lambda opt: abs(opt.strike - strike))
-        if abs(closest.strike - strike) < 5.0:
-            return closest
+    # The chain only holds this expiration, so one nearest-strike lookup covers
+    # both the exact match and the closest contract within $5
+    closest = _nearest_in_index(index, strike, option_type.lower().rstrip('s'))
+    if closest and abs(closest.strike - strike) < 5.0:
+        return closest
     
     return None
 
@@ -259,14 +491,12 @@ def get_current_option_price(ticker: str, strike: float, option_type: str,
         return fallback_price, 'error' if fallback_price else (None, 'error')
     
     try:
-        if expiration:
-            opt = get_option_by_details(ticker, strike, option_type, expiration)
-            if opt:
-                return opt.mid_price, 'live'
-        
-        chain = get_option_chain(ticker, expiration)
-        if chain:
-            nearest = get_nearest_strike(chain, strike, option_type)
+        # One chain fetch serves the lookup. Matching by details and then
+        # falling back to the nearest strike in the same chain always ends at
+        # the nearest strike, so that is taken directly.
+        index = _get_strike_index(ticker, expiration)
+        if index:
+            nearest = _nearest_in_index(index, strike, option_type)
             if nearest:
                 return nearest.mid_price, 'live'
     except Exception as e:
@@ -285,6 +515,11 @@ def get_earnings_dates(ticker: str) -> List[date]:
     if not YFINANCE_AVAILABLE:
         return []
     
+    with _market_cache_lock:
+        cached = _earnings_cache.get(ticker)
+    if cached is not None:
+        return list(cached)
+    
     try:
         stock = yf.Ticker(ticker)
         calendar = stock.calendar
@@ -297,6 +532,10 @@ def get_earnings_dates(ticker: str) -> List[date]:
                         date_val = date_val.date()
                     if date_val >= date.today():
                         earnings_dates.append(date_val)
+        
+        # Only a successful lookup is cached, so errors are retried
+        with _market_cache_lock:
+            _earnings_cache.set(ticker, sorted(set(earnings_dates)), ttl_seconds=EARNINGS_CACHE_SECONDS)
     except Exception as e:
         logger.error(f"Error fetching earnings for {ticker}: {e}")
     
@@ -0,0 +1,44 @@
+"""Lightweight per-request timing hooks for spotting remaining hot paths."""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+# Per-request accumulator. It holds a mutable dict so time recorded in worker
+# threads (asyncio.to_thread runs in a copy of the context) is still visible
+# to the middleware that created it.
+_request_timings: ContextVar[Optional[Dict[str, int]]] = ContextVar('request_timings', default=None)
+
+# One request can record from several DB threads at once (/dashboard runs its
+# fetches concurrently), so the read-modify-write of a total is serialized
+_timings_lock = threading.Lock()
+
+
+@contextmanager
+def request_timings() -> Iterator[Dict[str, int]]:
+    """Collect named timings (in nanoseconds) for everything run inside the block."""
+    timings: Dict[str, int] = {}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Add the block's elapsed time to the current request's ``name`` total."""
+    timings = _request_timings.get()
+    if timings is None:
+        yield
+        return
+
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter_ns() - start
+        with _timings_lock:
+            timings[name] = timings.get(name, 0) + elapsed
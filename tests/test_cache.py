@@ -70,4 +70,32 @@ def test_cache_cleanup_expired():
     expiring_result = cache.get("expiring_key")
     
     assert permanent_result == "permanent_value"
-    assert expiring_result is None
\ No newline at end of file
+    assert expiring_result is None
+
+
+def test_cache_evicts_least_recently_used():
+    """Test that the oldest unused entry is evicted once the cache is full."""
+    cache = TTLCache(max_size=2)
+    
+    cache.set("key1", "value1", ttl_seconds=10)
+    cache.set("key2", "value2", ttl_seconds=10)
+    
+    # Reading key1 makes key2 the least recently used entry
+    assert cache.get("key1") == "value1"
+    cache.set("key3", "value3", ttl_seconds=10)
+    
+    assert cache.get("key1") == "value1"
+    assert cache.get("key2") is None
+    assert cache.get("key3") == "value3"
+
+
+def test_cache_set_drops_expired_entries():
+    """Test that writes clean up expired entries without cleanup_expired."""
+    cache = TTLCache()
+    
+    # A negative TTL stores an entry that is already expired
+    cache.set("stale_key", "stale_value", ttl_seconds=-1)
+    cache.set("fresh_key", "fresh_value", ttl_seconds=10)
+    
+    assert "stale_key" not in cache._cache
+    assert cache.get("fresh_key") == "fresh_value"
@@ -0,0 +1,18 @@
+"""Tests for the simplified greeks and IV calculations."""
+
+import sys
+import os
+
+# Add the parent directory to sys.path to import services
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.calculations import calculate_greeks
+
+
+def test_greeks_are_returned_as_independent_dicts():
+    """Memoized greeks should still come back as a dict the caller can modify."""
+    greeks = calculate_greeks("AAPL", 150.0, "Call")
+    
+    assert set(greeks) == {"delta", "gamma", "theta", "vega"}
+    greeks["delta"] = 99.0
+    assert calculate_greeks("AAPL", 150.0, "Call")["delta"] != 99.0
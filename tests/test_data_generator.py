@@ -0,0 +1,52 @@
+"""Tests for the mock data generators."""
+
+import sys
+import os
+
+import orjson
+
+# Add the parent directory to sys.path to import services
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import PortfolioItem, Alert, DMADataPoint
+from services import data_generator
+
+
+def test_mock_positions_are_valid_models(monkeypatch):
+    """Test that vectorized mock positions validate and serialize like regular models."""
+    monkeypatch.setattr(data_generator, "generate_real_positions", lambda: [])
+    
+    positions = data_generator.generate_mock_positions(count=200)
+    
+    assert [p.id for p in positions] == [f"pos_{i+1}" for i in range(200)]
+    for position in positions:
+        dumped = position.model_dump()
+        assert PortfolioItem.model_validate(dumped).model_dump() == dumped
+        assert 100 <= position.strike <= 500
+        assert 1 <= position.quantity <= 100
+        assert type(position.strike) is float and type(position.quantity) is int
+    
+    # NumPy scalars would make orjson raise here
+    orjson.dumps([p.model_dump() for p in positions])
+
+
+def test_dma_curve_is_ordered_and_plain_floats():
+    """Test that the DMA curve has one point per hour with plain float values."""
+    points = data_generator.generate_dma_curve(points=50)
+    
+    assert len(points) == 50
+    assert [p.time for p in points] == sorted(p.time for p in points)
+    assert all(type(p.value) is float for p in points)
+    assert DMADataPoint.model_validate(points[0].model_dump()) == points[0]
+
+
+def test_mock_alerts_are_valid_models():
+    """Test that vectorized mock alerts validate and use plain Python values."""
+    alerts = data_generator.generate_mock_alerts(count=50)
+    
+    assert [a.id for a in alerts] == [f"alert_{i+1}" for i in range(50)]
+    for alert in alerts:
+        dumped = alert.model_dump()
+        assert Alert.model_validate(dumped).model_dump() == dumped
+        assert type(alert.read) is bool
+    orjson.dumps([a.model_dump() for a in alerts])
@@ -0,0 +1,261 @@
+"""Tests for the Turso HTTP client and connection pool."""
+
+import asyncio
+import contextvars
+import sys
+import os
+import sqlite3
+import threading
+import time
+from unittest.mock import patch, MagicMock
+
+import pytest
+import requests
+
+# Add the parent directory to sys.path to import services
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import database
+from services.database import TursoClient, ConnectionPool, run_in_db_thread
+from services.timing import request_timings, timed
+
+
+def make_result(cols, rows):
+    """Build a pipeline result in Turso's response format."""
+    return {
+        "type": "ok",
+        "response": {
+            "type": "execute",
+            "result": {
+                "cols": [{"name": c} for c in cols],
+                "rows": [[{"type": "text", "value": v} for v in row] for row in rows],
+            },
+        },
+    }
+
+
+def test_execute_batch_sends_one_pipeline_request():
+    """Test that a batch is sent in a single request and split per statement."""
+    response = MagicMock(status_code=200)
+    response.json.return_value = {
+        "results": [
+            make_result(["ticker"], [["AAA"], ["BBB"]]),
+            make_result(["count"], [["2"]]),
+        ]
+    }
+    client = TursoClient("libsql://example.turso.io", "token")
+
+    with patch.object(client.session, "post", return_value=response) as mock_post:
+        tickers, counts = client.execute_batch([
+            ("SELECT ticker FROM daily_prices WHERE ticker > ?", ["A"]),
+            ("SELECT COUNT(*) AS count FROM daily_prices", ()),
+        ])
+
+    assert mock_post.call_count == 1
+    sent = mock_post.call_args.kwargs["json"]["requests"]
+    assert len(sent) == 2
+    assert sent[0]["stmt"]["args"] == [{"type": "text", "value": "A"}]
+    assert tickers == [{"ticker": "AAA"}, {"ticker": "BBB"}]
+    assert counts == [{"count": "2"}]
+
+
+def test_execute_batch_stores_repeated_sql_once():
+    """Test that repeated SQL is stored once and executed by sql_id."""
+    response = MagicMock(status_code=200)
+    response.json.return_value = {
+        "results": [
+            {"type": "ok", "response": {"type": "store_sql"}},
+            make_result(["close"], [["1.0"]]),
+            make_result(["close"], [["2.0"]]),
+        ]
+    }
+    client = TursoClient("libsql://example.turso.io", "token")
+    sql = "SELECT close FROM daily_prices WHERE ticker = ?"
+
+    with patch.object(client.session, "post", return_value=response) as mock_post:
+        first, second = client.execute_batch([(sql, ["AAA"]), (sql, ["BBB"])])
+
+    sent = mock_post.call_args.kwargs["json"]["requests"]
+    assert sent[0] == {"type": "store_sql", "sql_id": 1, "sql": sql}
+    assert [r["stmt"]["sql_id"] for r in sent[1:]] == [1, 1]
+    assert "sql" not in sent[1]["stmt"]
+    assert first == [{"close": "1.0"}]
+    assert second == [{"close": "2.0"}]
+
+
+def test_executemany_chunks_rows_into_pipeline_requests():
+    """Test that executemany sends one request per chunk with the SQL stored once."""
+    response = MagicMock(status_code=200)
+    response.json.return_value = {"results": []}
+    client = TursoClient("libsql://example.turso.io", "token")
+    sql = "INSERT INTO daily_prices (ticker, date) VALUES (?, ?)"
+    rows = [("AAA", f"2026-01-0{day}") for day in range(1, 6)]
+
+    with patch.object(client.session, "post", return_value=response) as mock_post:
+        client.executemany(sql, rows, batch_size=2)
+
+    assert mock_post.call_count == 3
+    first = mock_post.call_args_list[0].kwargs["json"]["requests"]
+    assert [r["type"] for r in first] == ["store_sql", "execute", "execute"]
+    assert first[2]["stmt"]["args"] == [
+        {"type": "text", "value": "AAA"}, {"type": "text", "value": "2026-01-02"}
+    ]
+
+
+def test_executemany_raises_on_failed_statements():
+    """Test that a statement error in the pipeline isn't silently dropped."""
+    response = MagicMock(status_code=200)
+    response.json.return_value = {
+        "results": [
+            {"type": "ok", "response": {"type": "store_sql"}},
+            {"type": "error", "error": {"message": "UNIQUE constraint failed"}},
+        ]
+    }
+    client = TursoClient("libsql://example.turso.io", "token")
+
+    with patch.object(client.session, "post", return_value=response):
+        with pytest.raises(RuntimeError, match="UNIQUE constraint failed"):
+            client.executemany("INSERT INTO daily_prices (ticker) VALUES (?)", [("AAA",)])
+
+
+def test_pool_reuses_sqlite_connections(tmp_path, monkeypatch):
+    """Test that released SQLite connections are handed out again."""
+    monkeypatch.delenv("TURSO_DATABASE_URL", raising=False)
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "pool.db"))
+    pool = ConnectionPool(max_size=2)
+
+    first = pool.acquire()
+    second = pool.acquire()
+    assert first is not second
+    assert pool.backend == "sqlite"
+
+    pool.release(first)
+    assert pool.acquire() is first
+
+    pool.release(first)
+    pool.release(second)
+    pool.close()
+
+
+def test_pool_retries_turso_after_falling_back(tmp_path, monkeypatch):
+    """Test that a failed Turso connection only falls back to SQLite until the retry."""
+    monkeypatch.setenv("TURSO_DATABASE_URL", "libsql://example.turso.io")
+    monkeypatch.setenv("TURSO_AUTH_TOKEN", "token")
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "fallback.db"))
+    turso = TursoClient("libsql://example.turso.io", "token")
+    attempts = [None, turso]
+    monkeypatch.setattr(database, "connect_turso", lambda: attempts.pop(0))
+    pool = ConnectionPool(max_size=2)
+
+    local = pool.acquire()
+    assert pool.backend == "sqlite"
+    pool.release(local)
+    # Within the retry interval the pool keeps serving SQLite
+    assert pool.acquire() is local
+    pool.release(local)
+
+    # Once the retry interval has passed, Turso is tried again
+    pool._turso_retry_at = 0.0
+    assert pool.acquire() is turso
+    assert pool.backend == "turso"
+    assert attempts == []
+    pool.close()
+
+
+def test_pool_serves_sqlite_while_turso_probe_is_in_flight(tmp_path, monkeypatch):
+    """Test that a slow Turso retry doesn't block other threads from getting SQLite."""
+    monkeypatch.setenv("TURSO_DATABASE_URL", "libsql://example.turso.io")
+    monkeypatch.setenv("TURSO_AUTH_TOKEN", "token")
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "fallback.db"))
+    probing = threading.Event()
+    finish_probe = threading.Event()
+
+    def slow_probe():
+        probing.set()
+        finish_probe.wait(5)
+        return None
+
+    monkeypatch.setattr(database, "connect_turso", lambda: None)
+    pool = ConnectionPool(max_size=2)
+    pool.release(pool.acquire())
+    monkeypatch.setattr(database, "connect_turso", slow_probe)
+    pool._turso_retry_at = 0.0
+
+    prober = threading.Thread(target=lambda: pool.release(pool.acquire()))
+    prober.start()
+    assert probing.wait(5)
+    # The probe is still running, yet another thread gets a connection
+    conn = pool.acquire()
+    assert isinstance(conn, sqlite3.Connection)
+    pool.release(conn)
+    finish_probe.set()
+    prober.join(5)
+    assert pool.backend == "sqlite"
+    pool.close()
+
+
+def test_failed_turso_request_falls_back_to_sqlite(tmp_path, monkeypatch):
+    """Test that a Turso request failure moves the pool to SQLite until the next probe."""
+    monkeypatch.setenv("TURSO_DATABASE_URL", "libsql://example.turso.io")
+    monkeypatch.setenv("TURSO_AUTH_TOKEN", "token")
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "fallback.db"))
+    turso = TursoClient("libsql://example.turso.io", "token")
+    monkeypatch.setattr(database, "connect_turso", lambda: turso)
+    monkeypatch.setattr(database, "_pool", ConnectionPool(max_size=2))
+
+    with pytest.raises(requests.ConnectionError):
+        with database.get_db() as db:
+            assert db is turso
+            raise requests.ConnectionError("turso down")
+
+    assert database._pool.backend == "sqlite"
+    with database.get_db() as db:
+        assert isinstance(db, sqlite3.Connection)
+    database._pool.close()
+
+
+def test_connect_turso_closes_client_when_probe_fails(monkeypatch):
+    """Test that an unreachable Turso doesn't leak the client's HTTP session."""
+    monkeypatch.setenv("TURSO_DATABASE_URL", "libsql://example.turso.io")
+    monkeypatch.setenv("TURSO_AUTH_TOKEN", "token")
+
+    with patch.object(TursoClient, "execute", side_effect=requests.ConnectionError("down")), \
+            patch.object(TursoClient, "close") as mock_close:
+        assert database.connect_turso() is None
+
+    mock_close.assert_called_once()
+
+
+def test_run_in_db_thread_keeps_request_timings():
+    """Test that DB work runs on the dedicated threads and still records timings."""
+    def work():
+        with timed("db"):
+            return threading.current_thread().name
+
+    async def main():
+        with request_timings() as timings:
+            name = await run_in_db_thread(work)
+        return name, timings
+
+    name, timings = asyncio.run(main())
+    assert name.startswith("db")
+    assert "db" in timings
+
+
+def test_timed_totals_are_kept_across_threads():
+    """Test that concurrent timed() blocks in one request all count toward the total."""
+    def work():
+        for _ in range(20):
+            with timed("db"):
+                time.sleep(0.001)
+
+    with request_timings() as timings:
+        # Each thread runs in a copy of the request context, as run_in_db_thread does
+        threads = [threading.Thread(target=contextvars.copy_context().run, args=(work,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    # 160 blocks of at least 1 ms each; a lost update would drop some of them
+    assert timings["db"] >= 160 * 1_000_000
@@ -0,0 +1,258 @@
+"""Tests for the database-backed route helpers using a temporary SQLite file."""
+
+import sqlite3
+import sys
+import os
+from datetime import date, timedelta
+
+import pytest
+
+# Add the parent directory to sys.path to import api.routes
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import routes
+from services.database import ensure_indexes, close_pool, get_db, initialize_database, iter_query
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    """Create a small local database and point the app at it."""
+    db_path = tmp_path / "market_data.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE daily_prices (
+            ticker TEXT NOT NULL, date DATE NOT NULL,
+            open REAL, high REAL, low REAL, close REAL, volume INTEGER,
+            PRIMARY KEY (ticker, date)
+        );
+        CREATE TABLE iv_history (
+            ticker TEXT NOT NULL, date DATE NOT NULL,
+            atm_iv REAL, expiration TEXT,
+            PRIMARY KEY (ticker, date, expiration)
+        );
+        CREATE TABLE iv_52wk_ranges (
+            ticker TEXT PRIMARY KEY, high_52wk REAL, low_52wk REAL, updated_date DATE
+        );
+    """)
+    conn.executemany(
+        "INSERT INTO daily_prices VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [
+            ("AAA", "2026-01-01", 10.0, 11.0, 9.0, 10.5, 100),
+            ("AAA", "2026-01-02", 10.5, 11.0, 9.0, 10.0, 100),
+            ("BBB", "2026-01-01", 20.0, 23.0, 19.0, 22.5, 100),
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO iv_history VALUES (?, ?, ?, ?)",
+        [
+            ("AAA", "2026-01-01", 0.40, "Synthetic"),
+            ("AAA", "2026-01-02", 0.45, "Synthetic"),
+            ("BBB", "2026-01-01", 0.90, "Synthetic"),
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO iv_52wk_ranges VALUES (?, ?, ?, ?)",
+        [("AAA", 0.6, 0.3, "2026-01-02"), ("BBB", 1.0, 0.4, "2026-01-02")],
+    )
+    conn.commit()
+    conn.close()
+
+    monkeypatch.delenv("TURSO_DATABASE_URL", raising=False)
+    monkeypatch.delenv("TURSO_AUTH_TOKEN", raising=False)
+    monkeypatch.setenv("DATABASE_PATH", str(db_path))
+    # Pooled connections point at the previous test's database
+    close_pool()
+    yield db_path
+    close_pool()
+
+
+def replace_daily_prices(db_path, closes_by_ticker):
+    """Swap the fixture's bars for one bar per day per ticker with the given closes."""
+    start = date(2025, 1, 1)
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM daily_prices")
+    conn.executemany(
+        "INSERT INTO daily_prices VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [
+            (ticker, (start + timedelta(days=i)).isoformat(), close, close, close, close, 100)
+            for ticker, closes in closes_by_ticker.items()
+            for i, close in enumerate(closes)
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_fetch_positions_uses_latest_row_per_ticker(sqlite_db):
+    """Each ticker should produce one position built from its most recent bar."""
+    positions = routes.fetch_positions_from_db()
+
+    assert [p.symbol for p in positions] == ["AAA", "BBB"]
+    assert [p.id for p in positions] == ["pos_1", "pos_2"]
+    # AAA's latest bar closed below its open
+    assert positions[0].strike == 10.0
+    assert positions[0].type == "Put"
+    assert positions[1].strike == 22.5
+    assert positions[1].type == "Call"
+    # IV comes from each ticker's latest iv_history row
+    assert [p.iv for p in positions] == [0.45, 0.90]
+
+
+def test_fetch_alerts_filters_in_sql(sqlite_db):
+    """Only tickers crossing the IV or price-move thresholds should alert."""
+    alerts = routes.fetch_alerts_from_db()
+
+    assert [a.id for a in alerts] == ["alert_iv_1", "alert_price_2"]
+    assert alerts[0].title == "IV Elevated: BBB"
+    assert alerts[0].priority == "high"
+    assert alerts[1].description == "BBB gained 12.5% today"
+    assert alerts[1].priority == "high"
+
+
+def test_iter_query_reads_all_batches(sqlite_db):
+    """Rows streamed in small batches should match a full read."""
+    with get_db() as db:
+        rows = list(iter_query(db, "SELECT ticker, close FROM daily_prices ORDER BY ticker, date", batch_size=2))
+
+    assert rows == [
+        {"ticker": "AAA", "close": 10.5},
+        {"ticker": "AAA", "close": 10.0},
+        {"ticker": "BBB", "close": 22.5},
+    ]
+
+
+def test_indexes_cover_latest_row_queries(sqlite_db):
+    """The latest-row window query and the latest-IV query should use the indexes."""
+    ensure_indexes()
+
+    conn = sqlite3.connect(sqlite_db)
+    latest_price_plan = " ".join(row[3] for row in conn.execute("""
+        EXPLAIN QUERY PLAN
+        SELECT * FROM (
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY date DESC) AS rn
+            FROM daily_prices
+        )
+        WHERE rn = 1
+    """))
+    latest_iv_plan = " ".join(
+        row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + routes.LATEST_IV_SQL)
+    )
+    conn.close()
+
+    assert "idx_daily_prices_ticker_date" in latest_price_plan
+    assert "TEMP B-TREE" not in latest_price_plan
+    # Both the MAX(date) subquery and the outer date match use the date index
+    assert latest_iv_plan.count("idx_iv_history_date") == 2
+
+
+def test_created_schema_serves_the_dashboard_queries(tmp_path, monkeypatch):
+    """Tables created by initialize_database should have the columns the routes query."""
+    monkeypatch.delenv("TURSO_DATABASE_URL", raising=False)
+    monkeypatch.delenv("TURSO_AUTH_TOKEN", raising=False)
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "fresh.db"))
+    close_pool()
+    try:
+        initialize_database()
+        with get_db() as db:
+            db.execute("INSERT INTO daily_prices VALUES ('AAA', '2026-01-02', 10.0, 12.0, 9.0, 11.5, 100)")
+            db.execute("INSERT INTO iv_history VALUES ('AAA', '2026-01-02', 0.9, 'Synthetic')")
+            db.execute("INSERT INTO iv_52wk_ranges VALUES ('AAA', 1.0, 0.4, '2026-01-02')")
+            db.commit()
+
+        positions = routes.fetch_positions_from_db()
+        alerts = routes.fetch_alerts_from_db()
+    finally:
+        close_pool()
+
+    assert [(p.symbol, p.iv) for p in positions] == [("AAA", 0.9)]
+    assert [a.id for a in alerts] == ["alert_iv_1", "alert_price_2"]
+
+
+def test_fetch_dma_averages_the_last_50_bars(sqlite_db):
+    """The 20-day DMA should cover the last 50 bars and skip partial windows."""
+    closes = [100 + i + (i % 3) * 0.25 for i in range(60)]
+    replace_daily_prices(sqlite_db, {"AAA": closes, "BBB": [50.0] * 10})
+
+    points = routes.fetch_dma_from_db()
+
+    # Bars 10..59 are read, so the first full window ends at bar 29
+    assert len(points) == 50 - 19
+    assert points[0].time == "2025-01-30"
+    assert points[-1].time == "2025-03-01"
+    assert [p.value for p in points] == [
+        round(sum(closes[i - 19:i + 1]) / 20, 2) for i in range(29, 60)
+    ]
+
+
+def test_fetch_dma_is_empty_with_fewer_than_20_bars(sqlite_db):
+    """A ticker without a full 20-day window should produce no points."""
+    replace_daily_prices(sqlite_db, {"AAA": [10.0 + i for i in range(19)]})
+
+    assert routes.fetch_dma_from_db() == []
+
+
+def test_fetch_dma_by_ticker_limits_each_ticker(sqlite_db):
+    """Short histories are omitted, dma_200 needs 200 bars and output stops at bar 250."""
+    mid = [20 + (i % 7) * 0.5 for i in range(120)]
+    long = [100 + i * 0.1 for i in range(300)]
+    replace_daily_prices(sqlite_db, {"AAA": [10.0] * 30, "BBB": mid, "CCC": long})
+
+    result = routes.fetch_dma_by_ticker()
+
+    assert list(result) == ["BBB", "CCC"]
+
+    assert len(result["BBB"]) == 120 - 49
+    assert not any("dma_200" in point for point in result["BBB"])
+    assert result["BBB"][0] == {
+        "time": "2025-02-19",
+        "close": round(mid[49], 2),
+        "dma_50": round(sum(mid[:50]) / 50, 2),
+    }
+
+    # Bars 50..250 only, with the 200-day DMA from bar 200 onwards
+    assert len(result["CCC"]) == 250 - 49
+    assert sum("dma_200" in point for point in result["CCC"]) == 250 - 199
+    assert "dma_200" not in result["CCC"][149]
+    assert result["CCC"][150]["dma_200"] == round(sum(long[:200]) / 200, 2)
+    assert result["CCC"][-1] == {
+        "time": "2025-09-07",
+        "close": round(long[249], 2),
+        "dma_50": round(sum(long[200:250]) / 50, 2),
+        "dma_200": round(sum(long[50:250]) / 200, 2),
+    }
+
+
+def test_fetch_iv_by_ticker_groups_history(sqlite_db):
+    """IV rows should be grouped per ticker in date order with their 52-week range."""
+    conn = sqlite3.connect(sqlite_db)
+    conn.executemany(
+        "INSERT INTO iv_history VALUES (?, ?, ?, ?)",
+        [
+            ("AAA", "2025-12-31", 0.38, "Synthetic"),
+            ("BBB", "2026-01-02", None, "Synthetic"),
+            ("CCC", "2026-01-01", 0.5556, "Synthetic"),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+    result = routes.fetch_iv_by_ticker()
+
+    assert list(result) == ["AAA", "BBB", "CCC"]
+    assert [point["date"] for point in result["AAA"]] == ["2025-12-31", "2026-01-01", "2026-01-02"]
+    assert result["AAA"][0] == {"date": "2025-12-31", "iv": 0.38, "iv_52wk_high": 0.6, "iv_52wk_low": 0.3}
+    # The NULL IV row is dropped
+    assert result["BBB"] == [{"date": "2026-01-01", "iv": 0.9, "iv_52wk_high": 1.0, "iv_52wk_low": 0.4}]
+    # No 52-week range has been computed for CCC yet
+    assert result["CCC"] == [{"date": "2026-01-01", "iv": 0.556, "iv_52wk_high": None, "iv_52wk_low": None}]
+
+
+def test_fetch_debug_tickers_counts_rows(sqlite_db):
+    """The debug summary should list tickers and total rows from one grouped scan."""
+    replace_daily_prices(sqlite_db, {"CCC": [1.0] * 3, "AAA": [1.0] * 2, "BBB": [1.0]})
+
+    assert routes.fetch_debug_tickers() == {
+        "tickers": ["AAA", "BBB", "CCC"],
+        "total_rows": 6,
+        "source": "sqlite",
+    }
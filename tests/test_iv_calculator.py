@@ -0,0 +1,115 @@
+"""Tests for the Black-Scholes and implied volatility helpers."""
+
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to sys.path to import services
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.iv_calculator import (
+    black_scholes_batch, black_scholes_price, calculate_vega, calculate_iv_batch, calculate_implied_vol,
+    calculate_iv_with_greeks, _brent_implied_vol
+)
+
+
+def test_batch_prices_match_scalar_pricing():
+    """Test that batch prices and vega agree with the scalar functions."""
+    strikes = np.array([80.0, 95.0, 100.0, 105.0, 120.0])
+    is_call = np.array([True, False, True, False, True])
+    
+    result = black_scholes_batch(100.0, strikes, 0.25, 0.045, 0.3, is_call)
+    
+    for i, (strike, call) in enumerate(zip(strikes, is_call)):
+        option_type = 'call' if call else 'put'
+        assert abs(result['price'][i] - black_scholes_price(100.0, strike, 0.25, 0.045, 0.3, option_type)) < 1e-5
+        assert abs(result['vega'][i] - calculate_vega(100.0, strike, 0.25, 0.045, 0.3)) < 1e-6
+
+
+def test_batch_greeks_follow_put_call_parity():
+    """Test that call and put deltas differ by one and share gamma."""
+    result = black_scholes_batch(100.0, 100.0, 0.5, 0.045, 0.3, np.array([True, False]))
+    
+    assert abs(result['delta'][0] - result['delta'][1] - 1.0) < 1e-6
+    assert result['gamma'][0] == result['gamma'][1]
+    assert result['theta'][0] < 0
+
+
+def test_batch_expired_options_are_worth_intrinsic_value():
+    """Test that options at or past expiry are priced at intrinsic value."""
+    result = black_scholes_batch(100.0, np.array([90.0, 110.0]), 0.0, 0.045, 0.3, np.array([True, True]))
+    
+    assert list(result['price']) == [10.0, 0.0]
+    assert list(result['delta']) == [1.0, 0.0]
+    assert list(result['vega']) == [0.0, 0.0]
+
+
+def test_iv_batch_recovers_volatility_across_strikes():
+    """Test that batch IVs reprice each option and agree with the scalar solver."""
+    strikes = np.array([70.0, 90.0, 100.0, 110.0, 140.0])
+    is_call = np.array([True, False, True, False, True])
+    prices = black_scholes_batch(100.0, strikes, 0.25, 0.045, 0.35, is_call)['price']
+    
+    ivs = calculate_iv_batch(prices, 100.0, strikes, 0.25, 0.045, is_call)
+    
+    repriced = black_scholes_batch(100.0, strikes, 0.25, 0.045, ivs, is_call)['price']
+    assert np.all(np.abs(repriced - prices) < 0.01)
+    for i, (strike, call) in enumerate(zip(strikes, is_call)):
+        scalar = calculate_implied_vol(prices[i], 100.0, strike, 0.25, 0.045, 'call' if call else 'put')
+        assert abs(ivs[i] - scalar) < 0.01
+
+
+def test_iv_batch_marks_unsolvable_rows_as_nan():
+    """Test that rows the scalar solver rejects come back as NaN."""
+    ivs = calculate_iv_batch(
+        np.array([0.0, 5.0, 3.0]), 100.0, np.array([100.0, 80.0, 100.0]),
+        np.array([0.25, 0.25, 0.0]), 0.045, True
+    )
+    
+    # Zero price, below intrinsic value, and already expired
+    assert np.isnan(ivs).all()
+
+
+def test_iv_batch_accepts_scalar_inputs():
+    """Test that all-scalar arguments are solved as a single option."""
+    price = black_scholes_price(100.0, 100.0, 0.5, 0.05, 0.3, 'call')
+    
+    ivs = calculate_iv_batch(price, 100, 100, 0.5, 0.05, True)
+    
+    assert ivs.shape == (1,)
+    assert abs(ivs[0] - calculate_implied_vol(price, 100, 100, 0.5, 0.05, 'call')) < 0.01
+    assert np.isnan(calculate_iv_batch(0.0, 100, 100, 0.5, 0.05, True)).all()
+
+
+def test_batch_prices_deep_out_of_the_money_puts():
+    """Test that tiny put values keep their relative precision instead of cancelling to zero."""
+    result = black_scholes_batch(100.0, 60.0, 0.1, 0.045, 0.3, False)
+    expected = black_scholes_price(100.0, 60.0, 0.1, 0.045, 0.3, 'put')
+    
+    assert expected > 0
+    assert abs(result['price'] / expected - 1.0) < 1e-5
+    assert -1e-6 < result['delta'] < 0
+
+
+def test_brent_fallback_recovers_volatility():
+    """Test that the bracketed fallback solver reprices the option and rejects unbracketed prices."""
+    price = black_scholes_price(100.0, 150.0, 0.05, 0.045, 1.8, 'call')
+    
+    sigma = _brent_implied_vol(price, 100.0, 150.0, 0.05, 0.045, True, 0.001, 3.0, 50, 0.01)
+    
+    assert abs(black_scholes_price(100.0, 150.0, 0.05, 0.045, sigma, 'call') - price) < 0.01
+    # Worth more than the option could be at 300% volatility
+    assert _brent_implied_vol(99.0, 100.0, 150.0, 0.05, 0.045, True, 0.001, 3.0, 50, 0.01) is None
+
+
+def test_iv_with_greeks_matches_batch_greeks():
+    """Test that the Greeks returned with the IV match pricing at the solved volatility."""
+    price = black_scholes_price(100.0, 95.0, 0.3, 0.045, 0.4, 'put')
+    
+    result = calculate_iv_with_greeks(price, 100.0, 95.0, 0.3, 0.045, 'put')
+    
+    expected = black_scholes_batch(100.0, 95.0, 0.3, 0.045, result.iv, False)
+    assert result.iv == calculate_implied_vol(price, 100.0, 95.0, 0.3, 0.045, 'put')
+    for greek in ('delta', 'gamma', 'theta', 'vega'):
+        assert abs(getattr(result, greek) - expected[greek]) < 1e-6
@@ -0,0 +1,115 @@
+"""Tests for option chain parsing in the market data service."""
+
+import sys
+import os
+from datetime import date
+from unittest.mock import patch, MagicMock
+
+import orjson
+import pytest
+
+# Add the parent directory to sys.path to import services
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import market_data
+from services.market_data import get_option_chain
+
+
+SNAPSHOTS = {
+    "AAPL260320P00150000": {"latestQuote": {"bp": 2.0, "ap": 2.2}, "latestTrade": {"p": 2.1}},
+    "AAPL260320C00150000": {"latestQuote": {"bp": 5.0, "ap": 5.4}, "latestTrade": {}},
+    "AAPL260220C00155500": {"latestQuote": {"bp": 1.0, "ap": 1.2}, "latestTrade": {"p": 1.1}},
+    "NOT_AN_OPTION": {},
+}
+
+
+@pytest.fixture(autouse=True)
+def clear_market_caches():
+    """Each test starts without cached market data or credentials."""
+    market_data._chain_cache.clear()
+    market_data._chain_index_cache.clear()
+    market_data._price_cache.clear()
+    market_data.get_alpaca_headers.cache_clear()
+    yield
+    market_data._chain_cache.clear()
+    market_data._chain_index_cache.clear()
+    market_data._price_cache.clear()
+    market_data.get_alpaca_headers.cache_clear()
+
+
+def fetch_chain(expiration=None):
+    """Run get_option_chain against a canned Alpaca snapshot response."""
+    response = MagicMock(status_code=200)
+    response.content = orjson.dumps({"snapshots": SNAPSHOTS})
+    
+    with patch.dict(os.environ, {"ALPACA_API_KEY": "key", "ALPACA_API_SECRET": "secret"}), \
+            patch.object(market_data._SESSION, "get", return_value=response):
+        return get_option_chain("AAPL", expiration)
+
+
+def test_option_chain_parses_occ_symbols():
+    """Symbols should be parsed into sorted entries and invalid ones skipped."""
+    chain = fetch_chain()
+    
+    assert [(opt.expiration, opt.strike, opt.option_type) for opt in chain] == [
+        (date(2026, 2, 20), 155.5, "call"),
+        (date(2026, 3, 20), 150.0, "call"),
+        (date(2026, 3, 20), 150.0, "put"),
+    ]
+    assert chain[0].underlying == "AAPL"
+    assert chain[0].symbol == "AAPL260220C00155500"
+    # No trade price, so the last price falls back to the quote midpoint
+    assert chain[1].last_price == 5.2
+
+
+def test_option_chain_filters_expiration():
+    """Only contracts for the requested expiration should be returned."""
+    chain = fetch_chain(date(2026, 3, 20))
+    
+    assert [opt.symbol for opt in chain] == ["AAPL260320C00150000", "AAPL260320P00150000"]
+
+
+def test_option_by_details_picks_nearest_strike():
+    """A strike within $5 of the request should match the nearest contract."""
+    response = MagicMock(status_code=200)
+    response.content = orjson.dumps({"snapshots": SNAPSHOTS})
+    
+    with patch.dict(os.environ, {"ALPACA_API_KEY": "key", "ALPACA_API_SECRET": "secret"}), \
+            patch.object(market_data._SESSION, "get", return_value=response):
+        exact = market_data.get_option_by_details("AAPL", 150.0, "Calls", date(2026, 3, 20))
+        near = market_data.get_option_by_details("AAPL", 153.0, "put", date(2026, 3, 20))
+        far = market_data.get_option_by_details("AAPL", 160.0, "put", date(2026, 3, 20))
+    
+    assert exact.symbol == "AAPL260320C00150000"
+    assert near.symbol == "AAPL260320P00150000"
+    assert far is None
+
+
+def test_option_chain_is_cached():
+    """A repeated lookup should reuse the chain instead of calling Alpaca again."""
+    response = MagicMock(status_code=200)
+    response.content = orjson.dumps({"snapshots": SNAPSHOTS})
+    
+    with patch.dict(os.environ, {"ALPACA_API_KEY": "key", "ALPACA_API_SECRET": "secret"}), \
+            patch.object(market_data._SESSION, "get", return_value=response) as mock_get:
+        first = get_option_chain("AAPL")
+        second = get_option_chain("AAPL")
+        get_option_chain("AAPL", date(2026, 3, 20))
+    
+    assert second is first
+    # A different expiration is a separate cache entry
+    assert mock_get.call_count == 2
+
+
+def test_stock_price_uses_alpaca_snapshot():
+    """Stock prices should come from the Alpaca snapshot and then the cache."""
+    response = MagicMock(status_code=200)
+    response.content = orjson.dumps({"latestTrade": {"p": 187.25}, "dailyBar": {"c": 186.0}})
+    
+    with patch.dict(os.environ, {"ALPACA_API_KEY": "key", "ALPACA_API_SECRET": "secret"}), \
+            patch.object(market_data._SESSION, "get", return_value=response) as mock_get:
+        assert market_data.get_stock_price("AAPL") == 187.25
+        assert market_data.get_stock_price("AAPL") == 187.25
+    
+    assert mock_get.call_count == 1
+    assert mock_get.call_args.args[0].endswith("/v2/stocks/AAPL/snapshot")
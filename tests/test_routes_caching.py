@@ -2,13 +2,16 @@
 
 from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock
+import asyncio
 import sys
 import os
+import time
 
 # Add the parent directory to sys.path to import main
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from main import app
+from api.routes import get_cached_or_fetch
 from services.cache import cache
 
 client = TestClient(app)
@@ -114,4 +117,113 @@ def test_positions_endpoint_nocache_override():
         
         # Responses should be different
         assert response1.json() != response2.json()
-        assert response2.json()[0]["symbol"] == "GOOGL"
\ No newline at end of file
+        assert response2.json()[0]["symbol"] == "GOOGL"
+
+def test_empty_db_result_falls_back_to_cached_mock():
+    """Test that an empty DB result serves mock data and caches it."""
+    # Clear cache before test
+    cache.clear()
+    
+    with patch('api.routes.fetch_alerts_from_db', return_value=[]) as mock_fetch:
+        response1 = client.get("/alerts")
+        assert response1.status_code == 200
+        assert len(response1.json()) > 0
+        
+        # Mock data is random, so identical responses mean the cache was hit
+        response2 = client.get("/alerts")
+        assert response1.json() == response2.json()
+        assert mock_fetch.call_count == 1
+
+
+def test_by_ticker_endpoint_caches_only_non_empty_results():
+    """Test that by-ticker data is cached, but an empty result is retried."""
+    # Clear cache before test
+    cache.clear()
+    
+    with patch('api.routes.fetch_iv_by_ticker', return_value={}) as mock_fetch:
+        assert client.get("/iv-data-by-ticker").json()["tickers"] == {}
+        client.get("/iv-data-by-ticker")
+        assert mock_fetch.call_count == 2
+    
+    data = {"AAPL": [{"date": "2026-01-02", "iv": 0.3}]}
+    with patch('api.routes.fetch_iv_by_ticker', return_value=data) as mock_fetch:
+        assert client.get("/iv-data-by-ticker").json() == {"tickers": data}
+        assert client.get("/iv-data-by-ticker").json() == {"tickers": data}
+        assert mock_fetch.call_count == 1
+
+
+def test_dashboard_shares_cache_with_individual_endpoints():
+    """Test that /dashboard combines the four payloads and reuses their cache entries."""
+    # Clear cache before test
+    cache.clear()
+    
+    positions = client.get("/positions").json()
+    alerts = client.get("/alerts").json()
+    
+    response = client.get("/dashboard")
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data) == {"positions", "alerts", "dma", "iv"}
+    # Mock data is random, so equality means the cached entries were reused
+    assert data["positions"] == positions
+    assert data["alerts"] == alerts
+    assert data["dma"] == client.get("/dma-data").json()
+    assert data["iv"] == client.get("/iv-data").json()
+
+
+def test_cached_endpoints_set_browser_cache_header():
+    """Test that cacheable responses carry Cache-Control unless nocache=1 is passed."""
+    response = client.get("/iv-data")
+    assert response.headers["Cache-Control"] == "max-age=30"
+    
+    response = client.get("/iv-data?nocache=1")
+    assert "Cache-Control" not in response.headers
+
+
+def test_concurrent_cache_misses_fetch_once():
+    """Test that simultaneous misses for one key trigger a single fetch."""
+    # Clear cache before test
+    cache.clear()
+    
+    calls = []
+    
+    def slow_fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return ["value"]
+    
+    request = MagicMock()
+    request.query_params = {}
+    
+    async def fetch_concurrently():
+        return await asyncio.gather(*(
+            get_cached_or_fetch(request, "concurrent_test", slow_fetch, list, "test")
+            for _ in range(3)
+        ))
+    
+    results = asyncio.run(fetch_concurrently())
+    
+    assert results == [["value"]] * 3
+    assert len(calls) == 1
+
+
+def test_responses_are_rendered_with_orjson():
+    """Test that endpoints use the orjson response class by default."""
+    from fastapi.responses import ORJSONResponse
+    
+    route = next(r for r in app.routes if getattr(r, "path", None) == "/iv-data")
+    assert issubclass(route.response_class, ORJSONResponse)
+    
+    response = client.get("/iv-data")
+    assert response.headers["content-type"] == "application/json"
+    assert isinstance(response.json(), list)
+
+
+def test_responses_include_timing_headers():
+    """Test that the timing middleware reports total, DB and rendering time."""
+    response = client.get("/")
+    
+    assert int(response.headers["X-Route-Total-ns"]) > 0
+    assert response.headers["X-Route-DB-ns"] == "0"
+    # The health check body is rendered by the timed default response class
+    assert 0 < int(response.headers["X-Route-Serialize-ns"]) < int(response.headers["X-Route-Total-ns"])
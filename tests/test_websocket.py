@@ -0,0 +1,73 @@
+"""Tests for the websocket endpoint and broadcasts."""
+
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, patch
+import asyncio
+import json
+import sys
+import os
+
+# Add the parent directory to sys.path to import main
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import app
+from api import routes
+
+client = TestClient(app)
+
+
+def test_websocket_unregisters_on_disconnect():
+    """Test that a client is tracked while connected and removed after closing."""
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_text("ping")
+        assert len(routes.active_connections) == 1
+    
+    assert len(routes.active_connections) == 0
+
+
+def test_broadcast_drops_failed_connections():
+    """Test that every client gets the message and failing clients are removed."""
+    healthy = AsyncMock()
+    broken = AsyncMock()
+    broken.send_text.side_effect = RuntimeError("connection closed")
+    routes.add_connection(healthy)
+    routes.add_connection(broken)
+    
+    try:
+        asyncio.run(routes.broadcast_update({"type": "price", "value": 1}))
+        
+        healthy.send_text.assert_awaited_once()
+        assert json.loads(healthy.send_text.await_args.args[0]) == {"type": "price", "value": 1}
+        assert healthy in routes.active_connections
+        assert broken not in routes.active_connections
+        broken.close.assert_awaited_once_with(code=1011)
+        healthy.close.assert_not_awaited()
+    finally:
+        routes.remove_connection(healthy)
+        routes.remove_connection(broken)
+
+
+def test_broadcast_drops_stalled_connections():
+    """Test that a client that doesn't accept a send in time is removed."""
+    async def stall(message):
+        await asyncio.sleep(1)
+    
+    healthy = AsyncMock()
+    stalled = AsyncMock()
+    stalled.send_text.side_effect = stall
+    routes.add_connection(healthy)
+    routes.add_connection(stalled)
+    
+    try:
+        with patch.object(routes, "BROADCAST_SEND_TIMEOUT", 0.05):
+            asyncio.run(routes.broadcast_update({"type": "price", "value": 1}))
+    
+        healthy.send_text.assert_awaited_once()
+        assert healthy in routes.active_connections
+        assert stalled not in routes.active_connections
+        # The stalled client is closed so its handler exits and it reconnects
+        stalled.close.assert_awaited_once_with(code=1011)
+        healthy.close.assert_not_awaited()
+    finally:
+        routes.remove_connection(healthy)
+        routes.remove_connection(stalled)